@@ -1,19 +1,31 @@
-import json
+import heapq
 import time
-from collections import deque
+from collections import deque, Counter
 from dataclasses import dataclass, field
 
-import cv2
 import numpy as np
 
 from data.enums import BloonsDifficulty, BloonsScreen, SCREEN_TRANSITIONS, MAP_SELECT_THUMBNAIL_POSITIONS, \
     DIFFICULTY_SELECT_POSITIONS, GAMEMODE_SELECT_POSITIONS, BloonsGamemode, Track, TRACK_THUMBNAIL_LOCATIONS, \
     MAP_SELECT_RIGHT_ARROW_POSITION, MAP_SELECT_LEFT_ARROW_POSITION, Tower, TOWER_HOTKEYS, UPGRADE_HOTKEYS, Hero, \
-    CoverageType, DAMAGE_TYPE_BY_COVERAGE, COVERAGE_RATIOS
+    CoverageType, COVERAGE_BITS, DAMAGE_TYPE_COVERAGE_MASKS, PathProfile
 from interaction import WindowManager, InputController
+from crosspaths import CrosspathStats, CROSSPATHS, MAX_TIER, CROSSPATH_STATS_DTYPE, UPGRADE_PATHS, DAMAGE_TYPE_CODES, \
+    COVERAGE_TYPES, COVERAGE_BIT_VALUES, COVERAGE_MASK_BITS, DESIRED_COVERAGE_RATIOS, NEXT_COLUMNS, NEXT_TIERS, \
+    bits_to_coverage, crosspath_column
+from flow_points import FlowPointIndex
+from frame_service import FrameService
 from money_reader import MoneyReader
-from system_flags import vprint, PIXELS_PER_BLOONS_UNIT, SUPPRESS_PLACEMENT_LOCATION_OUTPUT, UPGRADE_DELAY
-from vision import identify_screen, get_current_tab
+from catalog import get_catalog, TowerSpec, UpgradeSpec, HeroSpec
+from placement import PlacementEngine, OccupancyIndex, Footprint, PackedMask
+from track_cache import TRACK_CACHE
+from upgrade_orders import UpgradeOrders, UPGRADE_ORDERS_PATH
+from system_flags import vprint, PIXELS_PER_BLOONS_UNIT, SUPPRESS_PLACEMENT_LOCATION_OUTPUT, UPGRADE_DELAY, \
+    CHECK_TOWER_AGGREGATES, FRAME_MAX_AGE_MS
+from vision import identify_screen_fast, get_current_tab
+
+# How much upgrades are rewarded for the coverage deficits they help close (ADJUST THIS IF NECESSARY!)
+UPGRADE_COVERAGE_INCENTIVE = 1.5
 
 
 @dataclass
@@ -25,19 +37,27 @@ class PlacedTower:
     id: int = field(default_factory=lambda: int(time.time() * 1000))
 
 
+@dataclass
+class StrategyTables:
+    """Per-tower values that only depend on static data and the difficulty (built by set_gamemode)."""
+    # Cost of each single upgrade, indexed [path, tier] (-1 where there is no upgrade)
+    upgrade_costs: dict[Tower, np.ndarray]
+    # Row of each tower in the arrays below
+    tower_rows: dict[Tower, int]
+    # Coverage mask of each unupgraded tower and the factor get_placement_weights applies for its DPS efficiency
+    # and future value, by tower row
+    base_coverage: np.ndarray
+    row_placement_bonuses: np.ndarray
+    # Every upgrade step, indexed [tower row, crosspath column, path]: its cost (-1 if the step is illegal or
+    # missing), the tower's coverage mask after it and its upgrade order score (see _compute_upgrade_order_score)
+    step_costs: np.ndarray
+    step_coverage: np.ndarray
+    step_scores: np.ndarray
+
+
 class BloonsBrain:
     def __init__(self, window_title: str = "BloonsTD6"):
-        # Track data
-        self.selected_track: Track | None = None
-        self.track_mask = self.land_mask = self.water_mask = self.flow_points = None
-
-        # Game data
-        self.difficulty: BloonsDifficulty | None = None
-        self.gamemode: BloonsGamemode | None = None
-        self.placed_towers: list[PlacedTower] = []
-        self.occupied_mask = None
-        self._estimated_money: int = 0
-        self._last_money_estimate_time: float | None = None
+        self._init_game_state()
 
         # Window controller
         self.window_manager = WindowManager(window_title)
@@ -45,20 +65,65 @@ class BloonsBrain:
             raise RuntimeError(f"Window '{window_title}' not found.")
         self.controller: InputController = self.window_manager.get_relative_controller()
 
+        # Shared window frames (screen checks, navigation and the money reader reuse each other's grabs)
+        self.frames = FrameService(self.window_manager)
+
         # Money reader thread
-        self.money_reader = MoneyReader(self.window_manager, interval=3)
+        self.money_reader = MoneyReader(self.frames, interval=3)
+
+        self._load_game_data()
+
+    @classmethod
+    def for_game_data(cls) -> "BloonsBrain":
+        """
+        A brain with only the game data loaded (no game window), for offline tools. Tracks, game modes and
+        planning work as usual; anything that reads or clicks the window needs a window manager and controller.
+        """
+        brain = cls.__new__(cls)
+        brain._init_game_state()
+        brain._load_game_data()
+        return brain
 
-        # Tower data
-        with open("data/combined_towers.json", "r", encoding="utf-8") as f:
-            self.tower_data = json.load(f)
-        with open("data/merged_upgrades.json", "r", encoding="utf-8") as f:
-            self.upgrade_data = json.load(f)
-        with open("data/hero_properties.json", "r", encoding="utf-8") as f:
-            self.hero_data = json.load(f)
+    def _init_game_state(self):
+        # Track data
+        self.selected_track: Track | None = None
+        self.track_mask: PackedMask | None = None
+        self.land_mask: PackedMask | None = None
+        self.water_mask: PackedMask | None = None
+        self.flow_points: np.ndarray | None = None
+        self.flow_index: FlowPointIndex | None = None
+        self.placement_engine: PlacementEngine | None = None
 
+        # Game data
+        self.difficulty: BloonsDifficulty | None = None
+        self.gamemode: BloonsGamemode | None = None
+        self.placed_towers: list[PlacedTower] = []
+        self._reset_tower_aggregates()
+        self.path_profile: PathProfile = PathProfile.UNIFORM
+        self._strategy_tables: dict[BloonsDifficulty, StrategyTables] = {}
+        self._reset_action_memo()
+        self.occupancy: OccupancyIndex | None = None
+        self._estimated_money: int = 0
+        self._last_money_estimate_time: float | None = None
         self.selected_hero: Hero | None = None
         self.hero_placed: bool = False
 
+    def _load_game_data(self):
+        # Tower data (parsed once per process, and cached on disk between runs)
+        self.catalog = get_catalog()
+        self.tower_data: dict[str, TowerSpec] = self.catalog.towers
+        self.upgrade_data: dict[str, tuple[UpgradeSpec, ...]] = self.catalog.upgrades
+        self.upgrade_index = self.catalog.upgrade_index
+        self.hero_data: dict[str, HeroSpec] = self.catalog.heroes
+        if self.catalog.crosspath_stats is None:
+            self.catalog.crosspath_stats = self._build_crosspath_stats()
+        self.crosspath_stats: CrosspathStats = self.catalog.crosspath_stats
+
+        # Upgrade orders solved offline (processing_tools/solve_upgrade_orders.py)
+        self.upgrade_orders = UpgradeOrders.load()
+        if self.upgrade_orders is None:
+            vprint(f"No usable upgrade order table at '{UPGRADE_ORDERS_PATH}', scoring upgrades greedily.")
+
     ############## MONEY HANDLING ##############
 
     @property
@@ -82,7 +147,7 @@ class BloonsBrain:
 
     ############## TOWER INFO ##############
 
-    def get_tower_info(self, tower: Tower | Hero) -> dict:
+    def get_tower_info(self, tower: Tower | Hero) -> TowerSpec | HeroSpec:
         if isinstance(tower, Tower):
             return self.tower_data[tower.value]
         elif isinstance(tower, Hero):
@@ -90,18 +155,24 @@ class BloonsBrain:
         raise TypeError(f"Unsupported entity type: {type(tower)}")
 
     def get_tower_range_px(self, tower: Tower | Hero) -> int:
-        return int(self.get_tower_info(tower)["base_range"] * PIXELS_PER_BLOONS_UNIT)
+        return int(self.get_tower_info(tower).base_range * PIXELS_PER_BLOONS_UNIT)
 
     def get_tower_cost(self, tower: Tower | Hero) -> int:
-        return self.get_tower_info(tower)["base_costs"][self.difficulty.value]
+        return self.get_tower_info(tower).base_costs[self.difficulty.value]
 
     def get_tower_damage_type(self, tower_obj: PlacedTower) -> str:
+        """Current damage type of the placed tower (see _compute_tower_damage_type)."""
+        stats = self.crosspath_stats.lookup(tower_obj.tower, tower_obj.upgrades)
+        if stats is not None:
+            return CrosspathStats.damage_type(int(stats["damage_type"]))
+        return self._compute_tower_damage_type(tower_obj)
+
+    def _compute_tower_damage_type(self, tower_obj: PlacedTower) -> str:
         """
         Determine the current damage type of the placed tower, based on its highest-tier upgrades.
         If multiple upgrades change the damage type differently, the first non-base type is chosen.
         """
-        tower_info = self.get_tower_info(tower_obj.tower)
-        base_type = tower_info.get("damage_type", "Normal")
+        base_type = self.get_tower_info(tower_obj.tower).damage_type
 
         # Track the highest tier purchased per path
         highest_by_path = {path: tier for path, tier in tower_obj.upgrades.items() if tier > 0}
@@ -111,7 +182,7 @@ class BloonsBrain:
         for path, tier in highest_by_path.items():
             try:
                 upgrade = self._get_upgrade(tower_obj.tower, path, tier)
-                dt = upgrade.get("Damage Type")
+                dt = upgrade.damage_type
                 if dt and dt != base_type:
                     damage_types.append(dt)
             except ValueError:
@@ -119,45 +190,72 @@ class BloonsBrain:
 
         return damage_types[0] if damage_types else base_type
 
+    def get_tower_coverage_mask(self, tower: PlacedTower) -> int:
+        """Return the tower's coverage as a bitmask over CoverageType (see COVERAGE_BITS)."""
+        stats = self.crosspath_stats.lookup(tower.tower, tower.upgrades)
+        if stats is not None:
+            return int(stats["coverage"])
+        return self._compute_tower_coverage_mask(tower)
+
     def get_tower_coverage(self, tower: PlacedTower) -> dict:
         """Return a dictionary of tower coverage."""
+        return bits_to_coverage(self.get_tower_coverage_mask(tower))
+
+    def _compute_tower_coverage_mask(self, tower: PlacedTower) -> int:
+        """Apply the tower's upgrades tier by tier to work out its coverage bitmask."""
         tower_info = self.get_tower_info(tower.tower)
-        coverage = {coverage: False for coverage in CoverageType}
-        coverage[CoverageType.CAMO] = tower_info["base_sees_camo"]
+        coverage = COVERAGE_BITS[CoverageType.CAMO] if tower_info.base_sees_camo else 0
         # Check upgrades for added camo detection
         for path in tower.upgrades:
             for tier in range(1, tower.upgrades[path] + 1):
                 upgrade = self._get_upgrade(tower.tower, path, tier)
                 if upgrade:
-                    if upgrade["grants_camo"]:
-                        coverage[CoverageType.CAMO] = True
+                    if upgrade.grants_camo:
+                        coverage |= COVERAGE_BITS[CoverageType.CAMO]
 
         # Update coverage with tower damage type
-        damage_type = self.get_tower_damage_type(tower)
+        damage_type = self._compute_tower_damage_type(tower)
         if damage_type is None:
             return coverage
-
-        for c in CoverageType:
-            if c in DAMAGE_TYPE_BY_COVERAGE[damage_type]:
-                coverage[c] = True
-        return coverage
+        return coverage | DAMAGE_TYPE_COVERAGE_MASKS[damage_type]
 
     def get_tower_radius_px(self, tower: Tower | Hero) -> int:
         tower_info = self.get_tower_info(tower)
-        shape = tower_info["footprint_shape"]
+        shape = tower_info.footprint_shape
         if shape == "circular":
-            return int(tower_info["footprint_radius"] * PIXELS_PER_BLOONS_UNIT)
+            return int(tower_info.footprint_radius * PIXELS_PER_BLOONS_UNIT)
         elif shape == "rectangular":
             # Approximate rectangle as a circle with radius = half the diagonal
-            w = tower_info.get("footprint_width", 10)
-            h = tower_info.get("footprint_height", 10)
+            w = 10 if tower_info.footprint_width is None else tower_info.footprint_width
+            h = 10 if tower_info.footprint_height is None else tower_info.footprint_height
             radius = (w ** 2 + h ** 2) ** 0.5 / 2
             return int(radius * PIXELS_PER_BLOONS_UNIT)
         else:
             # Fallback
             return int(10 * PIXELS_PER_BLOONS_UNIT)
 
+    def get_tower_footprint(self, tower: Tower | Hero) -> Footprint:
+        """Return the exact footprint of a tower in pixels (used to build its placement structuring element)."""
+        tower_info = self.get_tower_info(tower)
+        shape = tower_info.footprint_shape
+        if shape == "circular":
+            return Footprint(shape, radius=int(tower_info.footprint_radius * PIXELS_PER_BLOONS_UNIT))
+        elif shape == "rectangular":
+            w = 10 if tower_info.footprint_width is None else tower_info.footprint_width
+            h = 10 if tower_info.footprint_height is None else tower_info.footprint_height
+            return Footprint(shape, width=int(w * PIXELS_PER_BLOONS_UNIT), height=int(h * PIXELS_PER_BLOONS_UNIT))
+        else:
+            # Fallback
+            return Footprint("circular", radius=int(10 * PIXELS_PER_BLOONS_UNIT))
+
     def calculate_tower_dps(self, tower_obj: PlacedTower) -> float:
+        """Estimated DPS for the given placed tower, including upgrades (see _compute_tower_dps)."""
+        stats = self.crosspath_stats.lookup(tower_obj.tower, tower_obj.upgrades)
+        if stats is not None:
+            return float(stats["dps"])
+        return self._compute_tower_dps(tower_obj)
+
+    def _compute_tower_dps(self, tower_obj: PlacedTower) -> float:
         """
         Calculate an estimated DPS for the given placed tower, including upgrades.
         Only considers basic damage, pierce, and cooldown. Effects like abilities,
@@ -166,10 +264,10 @@ class BloonsBrain:
         info = self.get_tower_info(tower_obj.tower)
 
         # Start with base stats
-        damage = info.get("damage") or 1
-        cooldown = info.get("cooldown") or 1.0
-        pierce = info.get("pierce") or 1
-        projectiles = info.get("projectiles") or 1
+        damage = info.damage or 1
+        cooldown = info.cooldown or 1.0
+        pierce = info.pierce or 1
+        projectiles = info.projectiles or 1
 
         # Apply upgrades
         for path_name, tier in tower_obj.upgrades.items():
@@ -178,10 +276,10 @@ class BloonsBrain:
                     upgrade = self._get_upgrade(tower_obj.tower, path_name, t)
                 except ValueError:
                     continue
-                damage = upgrade.get("Damage", damage) or 1
-                cooldown = upgrade.get("Cooldown", cooldown) or 1
-                pierce = upgrade.get("Pierce", pierce) or 1
-                projectiles = upgrade.get("Projectiles", projectiles) or 1
+                damage = upgrade.damage or 1
+                cooldown = upgrade.cooldown or 1
+                pierce = upgrade.pierce or 1
+                projectiles = upgrade.projectiles or 1
 
         if cooldown <= 0:
             return 0.0  # avoid division by zero
@@ -198,99 +296,147 @@ class BloonsBrain:
         except Exception:
             return 0.0
 
+    def _build_crosspath_stats(self) -> CrosspathStats:
+        """Compile every tower's stats in every legal crosspath state, applying upgrades tier by tier once."""
+        towers = [tower for tower in Tower if tower.value in self.tower_data and tower.value in self.upgrade_data]
+        table = np.zeros((len(towers), len(CROSSPATHS)), dtype=CROSSPATH_STATS_DTYPE)
+        for row, tower in enumerate(towers):
+            info = self.tower_data[tower.value]
+            for column, tiers in enumerate(CROSSPATHS):
+                upgrades = dict(zip(UPGRADE_PATHS, tiers))
+                tower_obj = PlacedTower(tower=tower, position=(0, 0), upgrades=upgrades)
+
+                cost = np.array(info.base_costs, dtype=np.int64)
+                tower_range = info.base_range
+                for path, tier in upgrades.items():
+                    for t in range(1, tier + 1):
+                        upgrade = self._get_upgrade(tower, path, t)
+                        cost += upgrade.cost
+                        tower_range += upgrade.added_range
+
+                damage_type = self._compute_tower_damage_type(tower_obj)
+                table[row, column] = (
+                    self._compute_tower_dps(tower_obj),
+                    DAMAGE_TYPE_CODES.get(damage_type, -1),
+                    self._compute_tower_coverage_mask(tower_obj),
+                    cost,
+                    tower_range,
+                )
+        return CrosspathStats(towers, table)
+
+    def get_placement_signature(self, tower: Tower | Hero) -> tuple[Footprint, int, str]:
+        """Return the (footprint, range, placement type) that determines where a tower can go."""
+        placement_type = self.get_tower_info(tower).placement_type
+        return self.get_tower_footprint(tower), self.get_tower_range_px(tower), placement_type
+
+    def get_placement_signatures(self) -> set[tuple[Footprint, int, str]]:
+        """Every distinct placement signature among the known towers and heroes."""
+        entities = [t for t in Tower if t.value in self.tower_data] + [h for h in Hero if h.value in self.hero_data]
+        return {self.get_placement_signature(entity) for entity in entities}
+
     ############## COLLECTIVE (GLOBAL) INFO ##############
 
+    def _reset_tower_aggregates(self):
+        """Running totals over placed_towers, kept up to date by place_tower and upgrade_tower."""
+        self.total_dps = 0.0
+        self.coverage_dps = np.zeros(len(COVERAGE_TYPES))
+        self.coverage_tower_counts = np.zeros(len(COVERAGE_TYPES), dtype=np.int64)
+        self.tower_type_counts: Counter[Tower] = Counter()
+
+    def _update_tower_aggregates(self, tower: PlacedTower, sign: int):
+        """Add (<sign> = 1) or remove (<sign> = -1) one tower's contribution to the running totals."""
+        dps = self.calculate_tower_dps(tower)
+        covers = COVERAGE_MASK_BITS[self.get_tower_coverage_mask(tower)]
+        self.total_dps += sign * dps
+        self.coverage_dps[covers] += sign * dps
+        self.coverage_tower_counts[covers] += sign
+        self.tower_type_counts[tower.tower] += sign
+
+        # Coverage ratios and type counts changed, and so may have this tower's upgrade options
+        self._memo_ratios_dirty = True
+        self._memo_dirty_towers.add(id(tower))
+
+    def _check_tower_aggregates(self):
+        """Compare the running totals with a full recomputation (only when CHECK_TOWER_AGGREGATES is set)."""
+        if not CHECK_TOWER_AGGREGATES:
+            return
+        dps, covers = self._get_placed_dps_and_coverage()
+        expected_counts = Counter(tower.tower for tower in self.placed_towers)
+        if (
+                not np.isclose(self.total_dps, dps.sum())
+                or not np.allclose(self.coverage_dps, dps @ covers)
+                or not np.array_equal(self.coverage_tower_counts, covers.sum(axis=0))
+                or +self.tower_type_counts != expected_counts
+        ):
+            raise RuntimeError(
+                f"Tower aggregates out of sync: total DPS {self.total_dps} vs {dps.sum()}, "
+                f"coverage DPS {self.coverage_dps} vs {dps @ covers}, "
+                f"counts {dict(+self.tower_type_counts)} vs {dict(expected_counts)}"
+            )
+
+    def get_global_coverage_mask(self) -> int:
+        return int(COVERAGE_BIT_VALUES[self.coverage_tower_counts > 0].sum())
+
     def get_global_coverage(self) -> dict:
-        global_coverage = {coverage: False for coverage in CoverageType}
-        for tower in self.placed_towers:
-            tower_cov = self.get_tower_coverage(tower)
-            for ctype, has in tower_cov.items():
-                if has:
-                    global_coverage[ctype] = True
-        return global_coverage
+        return bits_to_coverage(self.get_global_coverage_mask())
+
+    def _get_placed_dps_and_coverage(self) -> tuple[np.ndarray, np.ndarray]:
+        """DPS of each placed tower, and a (towers, coverage types) boolean matrix of what each one covers."""
+        dps = np.array([self.calculate_tower_dps(tower) for tower in self.placed_towers], dtype=np.float64)
+        masks = np.array([self.get_tower_coverage_mask(tower) for tower in self.placed_towers], dtype=np.int64)
+        return dps, COVERAGE_MASK_BITS[masks]
 
     def calculate_global_dps(self) -> dict:
         """
-        Calculate total DPS across all placed towers.
+        Total DPS across all placed towers.
         Also return total DPS for towers that can pop leads and detect camos.
         """
-        total_dps = 0.0
-        total_lead_dps = 0.0
-        total_camo_dps = 0.0
-
-        for tower_obj in self.placed_towers:
-            dps = self.calculate_tower_dps(tower_obj)
-            total_dps += dps
-
-            coverage = self.get_tower_coverage(tower_obj)
-            if coverage.get("lead"):
-                total_lead_dps += dps
-            if coverage.get("camo"):
-                total_camo_dps += dps
-
         return {
-            "total_dps": total_dps,
-            "lead_dps": total_lead_dps,
-            "camo_dps": total_camo_dps,
+            "total_dps": self.total_dps,
+            "lead_dps": float(self.coverage_dps[COVERAGE_TYPES.index(CoverageType.LEAD)]),
+            "camo_dps": float(self.coverage_dps[COVERAGE_TYPES.index(CoverageType.CAMO)]),
         }
 
     def get_coverage_ratios(self):
-        total_dps = 0
-        coverage_dps = {c: 0.0 for c in CoverageType}
-
-        for tower in self.placed_towers:
-            dps = self.calculate_tower_dps(tower)
-            total_dps += dps
-
-            tower_cov = self.get_tower_coverage(tower)
-            for ctype, has in tower_cov.items():
-                if has:
-                    coverage_dps[ctype] += dps
-
         # Avoid divide by zero
+        total_dps = self.total_dps
         if total_dps == 0:
             total_dps = 1
 
         # Normalize by total DPS
-        ratios = {c: coverage_dps[c] / total_dps for c in CoverageType}
-        return ratios
+        return {ctype: float(self.coverage_dps[i] / total_dps) for i, ctype in enumerate(COVERAGE_TYPES)}
+
+    def get_coverage_deficits(self, coverage_ratios: dict[CoverageType, float]) -> np.ndarray:
+        """How far each coverage type (in COVERAGE_TYPES order) is below its desired DPS share, 0 if it isn't."""
+        current = np.array([coverage_ratios.get(ctype, 0.0) for ctype in COVERAGE_TYPES])
+        return np.maximum(0.0, DESIRED_COVERAGE_RATIOS - current)
 
     ############## TRACK/GAME SETUP ##############
 
     def select_track(self, track: Track):
         """Load track data for the specified track folder"""
-        # Standard paths
-        track_folder_path = f"data/tracks/{track.value.lower().replace(' ', '_')}"
-        track_mask_path = f"{track_folder_path}/track_mask.png"
-        land_mask_path = f"{track_folder_path}/land_placement_mask.png"
-        water_mask_path = f"{track_folder_path}/water_placement_mask.png"
-        track_json_path = f"{track_folder_path}/path_points.json"
-
-        # Track mask
-        self.track_mask = cv2.imread(track_mask_path)
-        if self.track_mask is None:
-            raise RuntimeError(f"Could not load track mask: '{track_mask_path}'")
-
-        # Placement masks
-        self.land_mask = cv2.imread(land_mask_path)
-        if self.land_mask is None:
-            raise RuntimeError(f"Could not load land placement mask: '{land_mask_path}'")
-
-        self.water_mask = cv2.imread(water_mask_path)
-        if self.water_mask is None:
-            raise RuntimeError(f"Could not load water placement mask: '{water_mask_path}'")
-
-        # Occupied spaces mask
-        self.occupied_mask = np.zeros_like(self.land_mask[:, :, 0], dtype=np.uint8)
-
-        # Flow points
-        with open(track_json_path, "r", encoding="utf-8") as f:
-            data = json.load(f)
-        self.flow_points = data.get("flow_points", [])
-        if not self.flow_points:
-            raise RuntimeError(f"No flow points found in '{track_json_path}'.")
+        # Track data comes from the process-wide cache (loaded from the track bundle and placement atlas on a miss)
+        signatures = self.get_placement_signatures()
+        data = TRACK_CACHE.get(track, signatures)
+        self.track_mask = data.bundle.track_mask
+        self.land_mask = data.bundle.land_mask
+        self.water_mask = data.bundle.water_mask
+        self.flow_points = data.bundle.flow_points
+        self.flow_index = data.flow_index
+        self.placement_engine = engine = data.engine
+
+        # Occupied spaces, and how much placeable space each tower has left
+        self.occupancy = OccupancyIndex(engine.height, engine.width)
+        for footprint, _, placement_type in signatures:
+            feasible = engine.feasibility_map(placement_type, footprint)
+            self.occupancy.placeable_count(placement_type, footprint, feasible)
 
         self.selected_track = track
+        self._reset_action_memo()
+
+    def prefetch_track(self, track: Track):
+        """Start loading a track's data in the background, so a later select_track doesn't wait on disk."""
+        TRACK_CACHE.prefetch(track, self.get_placement_signatures())
 
     def set_gamemode(self, gamemode: BloonsGamemode):
         """Set gamemode and difficulty."""
@@ -300,6 +446,8 @@ class BloonsBrain:
         for difficulty, gamemode_dict in GAMEMODE_SELECT_POSITIONS.items():
             if gamemode in gamemode_dict:
                 self.difficulty = difficulty
+                self.get_strategy_tables()
+                self._reset_action_memo()
                 return
 
         raise ValueError(f"Could not derive difficulty for gamemode: {gamemode}")
@@ -316,11 +464,13 @@ class BloonsBrain:
     def wait_for_screen(self, target: BloonsScreen, timeout: float = 10.0, interval: float = 0.5) -> bool:
         """
         Wait until the game reaches the given screen, or timeout.
+        Only frames grabbed after the wait started count, so a check right after a click never sees the old screen.
         Returns True if successful, False if timeout reached.
         """
         start_time = time.time()
         while time.time() - start_time < timeout:
-            current_screen = identify_screen(self.window_manager.capture_window(force_focus=True))
+            max_age_ms = min(FRAME_MAX_AGE_MS, (time.time() - start_time) * 1000)
+            current_screen = identify_screen_fast(self.frames, force_focus=True, max_age_ms=max_age_ms)
             if current_screen == target:
                 return True
             time.sleep(interval)
@@ -353,7 +503,8 @@ class BloonsBrain:
             if self.difficulty is None:
                 raise RuntimeError("Difficulty not set.")
 
-            current_tab_idx = get_current_tab(self.window_manager.capture_window(force_focus=True)) - 1
+            frame = self.frames.next_frame(time.time(), force_focus=True)
+            current_tab_idx = get_current_tab(frame.image) - 1
             if current_tab_idx is None:
                 raise RuntimeError("Current tab index not provided.")
 
@@ -394,7 +545,7 @@ class BloonsBrain:
         raise RuntimeError(f"No special handler for {src} → {dst}")
 
     def navigate_to(self, target: BloonsScreen):
-        current_screen = identify_screen(self.window_manager.capture_window(force_focus=True))
+        current_screen = identify_screen_fast(self.frames, force_focus=True)
         if current_screen is None:
             raise RuntimeError("Could not identify current screen.")
         if current_screen == target:
@@ -429,7 +580,7 @@ class BloonsBrain:
             time.sleep(post_delay)
 
             if not self.wait_for_screen(dst):
-                current_screen = identify_screen(self.window_manager.capture_window(force_focus=True))
+                current_screen = identify_screen_fast(self.frames, force_focus=True)
                 print(f"Timeout: Expected {dst.name}, but got {current_screen}")
                 return False
 
@@ -438,15 +589,18 @@ class BloonsBrain:
 
     ############## TOWER PLACEMENT ##############
 
-    def place_tower(self, tower: Tower, position: tuple[float, float]):
-        current_screen = identify_screen(self.window_manager.capture_window(force_focus=True))
+    def to_window_position(self, pixel: tuple[int, int]) -> tuple[float, float]:
+        """Normalized window position (what clicks take) of a pixel on the track masks."""
+        h, w = self.land_mask.shape
+        return pixel[0] / w, pixel[1] / h
+
+    def place_tower(self, tower: Tower, pixel: tuple[int, int]):
+        """Place <tower> at a pixel on the track masks (as returned by find_best_action or plan_layout)."""
+        current_screen = identify_screen_fast(self.frames, force_focus=True)
         if current_screen not in (BloonsScreen.IN_GAME, BloonsScreen.SANDBOX_MONKEY_SCREEN):
             raise RuntimeError("Game is not running.")
 
-        # Convert normalized position → pixel coordinates
-        h, w = self.land_mask.shape[:2]
-        px = int(position[0] * w)
-        py = int(position[1] * h)
+        position = self.to_window_position(pixel)
         radius_px = self.get_tower_radius_px(tower)
 
         # Select and place
@@ -464,21 +618,20 @@ class BloonsBrain:
             radius_px=radius_px,
         )
         self.placed_towers.append(placed)
-        cv2.circle(self.occupied_mask, (px, py), int(radius_px * 1.5), 255, -1)
+        self._update_tower_aggregates(placed, 1)
+        self._check_tower_aggregates()
+        self.occupancy.add(pixel, self.get_tower_footprint(tower))
+        self._invalidate_memo_placements()
 
-    def place_hero(self, position: tuple[float, float]):
+    def place_hero(self, pixel: tuple[int, int]):
+        """Place the selected hero at a pixel on the track masks."""
         if self.selected_hero is None:
             raise RuntimeError("No hero selected.")
         if self.hero_placed:
             vprint("Hero already placed.")
             return
 
-        info = self.get_tower_info(self.selected_hero)
-        h, w = self.land_mask.shape[:2]
-        px = int(position[0] * w)
-        py = int(position[1] * h)
-        radius_px = int(info["footprint_radius"] * PIXELS_PER_BLOONS_UNIT)
-
+        position = self.to_window_position(pixel)
         self.controller.press_key("p")
         self.controller.click(*position)
 
@@ -487,152 +640,83 @@ class BloonsBrain:
         self.update_money_estimate(-cost)
 
         # Mark occupied space
-        cv2.circle(self.occupied_mask, (px, py), int(radius_px * 1.5), 255, -1)
+        self.occupancy.add(pixel, self.get_tower_footprint(self.selected_hero))
+        self._invalidate_memo_placements()
         self.hero_placed = True
 
-    def can_place_tower_on_map(self, tower: Tower | Hero, sample_step: int = 20) -> bool:
-        """Check if the tower can be placed anywhere"""
-        tower_info = self.get_tower_info(tower)
-        placement_type = tower_info["placement_type"]
-
-        if placement_type == "land":
-            mask = self.land_mask
-        elif placement_type == "water":
-            mask = self.water_mask
-        elif placement_type == "any":
-            mask = cv2.bitwise_or(self.land_mask, self.water_mask)
-        else:
-            return False
-
-        if mask is None:
+    def can_place_tower_on_map(self, tower: Tower | Hero) -> bool:
+        """Check if the tower can be placed anywhere (a lookup in the per-track placeable table)"""
+        if self.placement_engine is None:
             return False
-
-        tower_radius = self.get_tower_radius_px(tower)
-        h, w = mask.shape[:2]
-
-        for y in range(0, h, sample_step):
-            for x in range(0, w, sample_step):
-                if mask[y, x, 0] < 128:
-                    continue
-                y0 = max(y - tower_radius, 0)
-                y1 = min(y + tower_radius, h)
-                x0 = max(x - tower_radius, 0)
-                x1 = min(x + tower_radius, w)
-
-                # Ensure it doesn't overlap the track
-                if np.any(self.track_mask[y0:y1, x0:x1, 0] > 128):
-                    continue
-
-                # Found at least one valid spot
-                return True
-
-        return False
-
-    def find_best_placement(self, tower: Tower | Hero, sample_step: int = 15) -> tuple[float, float]:
+        footprint, _, placement_type = self.get_placement_signature(tower)
+        feasible = self.placement_engine.feasibility_map(placement_type, footprint)
+        return self.occupancy.placeable_count(placement_type, footprint, feasible) > 0
+
+    def find_best_placement(
+            self,
+            tower: Tower | Hero,
+            sample_step: int = 1,
+            pyramid: bool = True
+    ) -> tuple[int, int]:
         """
         Find a good placement position for the tower:
         - Valid terrain (land/water/any)
-        - Doesn't overlap the track (tower radius clearance)
+        - Tower footprint doesn't overlap the track
+        - Doesn't overlap already placed towers
         - Maximizes number of flow points in range
+        At full resolution the coarse-to-fine pyramid search is used (same answer as scanning every pixel).
+        Returns a pixel on the track masks (see to_window_position).
         """
-        if self.selected_track is None or self.flow_points is None:
+        if self.selected_track is None or self.placement_engine is None:
             raise RuntimeError("No track selected or flow points not loaded.")
 
         # Collect tower parameters
-        tower_info = self.get_tower_info(tower)
-        base_range = self.get_tower_range_px(tower)
-        tower_radius = self.get_tower_radius_px(tower)
-        placement_type = tower_info["placement_type"]
-
-        # Select the correct placement mask
-        if placement_type == "land":
-            mask = self.land_mask
-        elif placement_type == "water":
-            mask = self.water_mask
-        elif placement_type == "any":
-            mask = self.land_mask | self.water_mask
-        else:
-            raise ValueError(f"Unknown placement type: {placement_type}")
-
-        if mask is None:
-            raise RuntimeError(f"No mask loaded for {placement_type} placement.")
-        if self.track_mask is None:
-            raise RuntimeError("Track mask not loaded.")
-
-        # Prepare data for scanning
-        flow_pts = np.array(self.flow_points)
-        if flow_pts.shape[1] != 2:
-            raise ValueError("Flow points must be (x, y) pairs.")
-
-        h, w = mask.shape[:2]
-        range_sq = base_range ** 2
-        tower_r = int(np.ceil(tower_radius))
-
-        best_score = -1
-        best_pos = None
-
-        # Scan the full screen grid for valid placements (and score them)
-        for y in range(0, h, sample_step):
-            for x in range(0, w, sample_step):
-                # Validate terrain, track overlap, and tower overlap
-                if not self._is_valid_terrain(mask, x, y):
-                    continue
-                if self._intersects_track(x, y, tower_r, w, h):
-                    continue
-                if self._overlaps_existing_tower(x, y, tower_r, w, h):
-                    continue
-
-                # Score the placement by its flow point coverage
-                score = self._score_flow_point_coverage(flow_pts, x, y, range_sq)
+        footprint, base_range, placement_type = self.get_placement_signature(tower)
 
-                if score > best_score:
-                    best_score = score
-                    best_pos = (x, y)
-
-        if best_pos is None:
+        # Mask the whole-track coverage map by feasibility and take the best pixel
+        if pyramid and sample_step == 1:
+            result = self.placement_engine.best_placement_pyramid(
+                placement_type, footprint, base_range, self.occupancy
+            )
+        else:
+            result = self.placement_engine.best_placement(
+                placement_type, footprint, base_range, self.occupancy, sample_step
+            )
+        if result is None:
             raise RuntimeError(f"No valid placement found for {tower.value} on {self.selected_track}.")
-
-        # Normalize and return
-        norm_x, norm_y = best_pos[0] / w, best_pos[1] / h
+        best_pos, best_score = result
 
         if not SUPPRESS_PLACEMENT_LOCATION_OUTPUT:
+            norm_x, norm_y = self.to_window_position(best_pos)
             vprint(f"Best {tower.value} placement: ({norm_x:.3f}, {norm_y:.3f}) — covers {best_score} flow points")
 
-        return norm_x, norm_y
+        return best_pos
 
-    @staticmethod
-    def _is_valid_terrain(mask: np.ndarray, x: int, y: int) -> bool:
-        """Check if the mask allows placement at (x, y)."""
-        return bool(mask[y, x, 0] >= 128)
-
-    def _intersects_track(self, x: int, y: int, radius: int, w: int, h: int) -> bool:
-        """Return True if tower area overlaps the track."""
-        y0, y1 = max(y - radius, 0), min(y + radius, h)
-        x0, x1 = max(x - radius, 0), min(x + radius, w)
-        sub_track = self.track_mask[y0:y1, x0:x1, 0]
-        return np.any(sub_track > 128)
-
-    def _overlaps_existing_tower(self, x: int, y: int, radius: int, w: int, h: int) -> bool:
-        """Return True if area intersects already occupied region."""
-        y0, y1 = max(y - radius, 0), min(y + radius, h)
-        x0, x1 = max(x - radius, 0), min(x + radius, w)
-        return np.any(self.occupied_mask[y0:y1, x0:x1] > 0)
+    def find_best_placements(
+            self,
+            towers: list[Tower | Hero]
+    ) -> dict[Tower | Hero, tuple[tuple[int, int], int] | None]:
+        """
+        Find the best placement for several towers at once.
+        Towers with the same placement signature are only searched once.
+        Returns {tower: ((x, y) pixel on the track masks, flow points covered)}, or None for towers that don't fit
+        anywhere.
+        """
+        if self.selected_track is None or self.placement_engine is None:
+            raise RuntimeError("No track selected or flow points not loaded.")
 
-    @staticmethod
-    def _score_flow_point_coverage(flow_pts: np.ndarray, x: int, y: int, range_sq: float) -> int:
-        """Count how many flow points lie within tower range."""
-        dist2 = (flow_pts[:, 0] - x) ** 2 + (flow_pts[:, 1] - y) ** 2
-        return np.sum(dist2 < range_sq)
+        signatures = {tower: self.get_placement_signature(tower) for tower in towers}
+        results = self.placement_engine.best_placements(set(signatures.values()), self.occupancy)
+        return {tower: results[signature] for tower, signature in signatures.items()}
 
     ############## UPGRADES ##############
 
     def _get_upgrade(self, tower: Tower, path: str, tier: int):
-        upgrades = self.upgrade_data[tower]
-        path_num = {"top": 1, "middle": 2, "bottom": 3}[path]
-        for upgrade in upgrades:
-            if upgrade["path"] == path_num and upgrade["tier"] == tier:
-                return upgrade
-        raise ValueError(f"Upgrade not found for {tower.value} at tier {tier} on path {path}.")
+        tiers = self.upgrade_index[tower][path]
+        upgrade = tiers[tier] if 0 <= tier < len(tiers) else None
+        if upgrade is None:
+            raise ValueError(f"Upgrade not found for {tower.value} at tier {tier} on path {path}.")
+        return upgrade
 
     def get_next_upgrade(self, tower: PlacedTower, path: str):
         """Get the next upgrade for a tower in the provided path"""
@@ -645,7 +729,7 @@ class BloonsBrain:
             raise ValueError(f"Invalid path '{path}', must be 'top', 'middle', or 'bottom'.")
 
         upgrade = self.get_next_upgrade(tower_obj, path)
-        cost = upgrade["cost"][self.difficulty.value]
+        cost = self.get_upgrade_cost(tower_obj.tower, path, tower_obj.upgrades[path] + 1)
         if self.money < cost:
             raise RuntimeError(
                 f"Not enough money to upgrade {tower_obj.tower.value} ({path} → {tower_obj.upgrades[path]})")
@@ -657,21 +741,57 @@ class BloonsBrain:
         self.controller.click(*tower_obj.position)
 
         vprint(
-            f"Upgraded {tower_obj.tower.value} with {upgrade['name']} ({path} → {tower_obj.upgrades[path] + 1}) for ${cost}/{self.money}"
+            f"Upgraded {tower_obj.tower.value} with {upgrade.name} ({path} → {tower_obj.upgrades[path] + 1}) for ${cost}/{self.money}"
         )
 
         self.update_money_estimate(-cost)
 
         # Increment internal tracking
+        self._update_tower_aggregates(tower_obj, -1)
         tower_obj.upgrades[path] += 1
+        self._update_tower_aggregates(tower_obj, 1)
+        self._check_tower_aggregates()
+
+    def _compute_upgrade_order_score(self, tower_obj: PlacedTower, path: str) -> float:
+        """
+        Discounted DPS per dollar of taking the next upgrade on <path> and then following the solved upgrade order.
+        Unlike evaluate_upgrade_dps_efficiency, this credits cheap upgrades that lead to strong later tiers.
+        Falls back to evaluate_upgrade_dps_efficiency for towers or states missing from the table.
+        Precomputed for every step in the strategy tables (step_scores).
+        """
+        if self.upgrade_orders is not None:
+            scores = self.upgrade_orders.step_scores(tower_obj.tower, self.difficulty)
+            column = crosspath_column(tower_obj.upgrades)
+            if scores is not None and column >= 0:
+                score = scores[column, UPGRADE_PATHS.index(path)]
+                if not np.isnan(score):
+                    return max(float(score), 0.0)
+        return self.evaluate_upgrade_dps_efficiency(tower_obj, path)
+
+    def get_upgrade_cost(self, tower: Tower, path: str, tier: int) -> int:
+        """Cost of one upgrade at the current difficulty."""
+        costs = self.get_strategy_tables().upgrade_costs.get(tower)
+        cost = int(costs[UPGRADE_PATHS.index(path), tier]) if costs is not None and 0 <= tier <= MAX_TIER else -1
+        if cost < 0:
+            raise ValueError(f"Upgrade not found for {tower.value} at tier {tier} on path {path}.")
+        return cost
 
     def evaluate_upgrade_dps_efficiency(self, tower_obj: PlacedTower, path: str) -> float:
         """Estimate DPS gain per dollar for the next upgrade."""
+        current = self.crosspath_stats.lookup(tower_obj.tower, tower_obj.upgrades)
+        upgraded = self.crosspath_stats.lookup(
+            tower_obj.tower, {**tower_obj.upgrades, path: tower_obj.upgrades[path] + 1}
+        )
+        if current is not None and upgraded is not None:
+            cost = int(upgraded["cost"][self.difficulty.value] - current["cost"][self.difficulty.value])
+            gain = float(upgraded["dps"] - current["dps"])
+            return gain / cost if cost > 0 and gain > 0 else 0.0
+
         try:
             current_dps = self.calculate_tower_dps(tower_obj)
             next_tier = tower_obj.upgrades[path] + 1
             upgrade = self._get_upgrade(tower_obj.tower, path, next_tier)
-            cost = upgrade["cost"][self.difficulty.value]
+            cost = upgrade.cost[self.difficulty.value]
             if cost <= 0:
                 return 0.0
 
@@ -703,182 +823,425 @@ class BloonsBrain:
         total_value = 0.0
         for upgrade in upgrades:
             # Ignore crosspath-locked tiers above 2 unless they're pure
-            if upgrade["tier"] > 5 or upgrade["cost"][self.difficulty.value] <= 0:
+            if upgrade.tier > 5 or upgrade.cost[self.difficulty.value] <= 0:
                 continue
 
-            cost = upgrade["cost"][self.difficulty.value]
-            dmg = upgrade.get("Damage", 0)
-            pierce = upgrade.get("Pierce", 1)
-            proj = upgrade.get("Projectiles", 1)
-            cd = upgrade.get("Cooldown", 1.0)
+            cost = upgrade.cost[self.difficulty.value]
+            dmg = upgrade.damage
+            pierce = upgrade.pierce
+            proj = upgrade.projectiles
+            cd = upgrade.cooldown
 
             # Simple DPS estimate
             try:
                 dps = (dmg * pierce * proj) / cd if cd > 0 else 0
-                value = (dps / cost) * (discount ** (upgrade["tier"] - 1))
+                value = (dps / cost) * (discount ** (upgrade.tier - 1))
             except TypeError:
                 value = 0
             total_value += value
 
         return total_value
 
-    def evaluate_tower_placement(self, tower, pos, coverage_ratios: dict[CoverageType, float]):
-        # Reward towers that cover more flow points
-        range_px = self.get_tower_range_px(tower)
-        h, w = self.land_mask.shape[:2]
-        x, y = int(pos[0] * w), int(pos[1] * h)
-        flow_pts = np.array(self.flow_points)
-        dist2 = (flow_pts[:, 0] - x) ** 2 + (flow_pts[:, 1] - y) ** 2
-        track_coverage_score = np.sum(dist2 < range_px ** 2)
-
-        # --- Get what this tower *provides* in coverage ---
-        temp_tower = PlacedTower(tower=tower, position=pos)
-        tower_cov = self.get_tower_coverage(temp_tower)
-
-        # --- Weight coverage by what we *need more of* ---
-        coverage_weight = 0.0
-        for ctype, has in tower_cov.items():
-            if not has:
-                continue
+    def _build_strategy_tables(self) -> StrategyTables:
+        towers = [tower for tower in Tower if tower.value in self.tower_data]
+        upgrade_costs = {}
+        for tower in towers:
+            costs = np.full((len(UPGRADE_PATHS), MAX_TIER + 1), -1, dtype=np.int64)
+            for p, path in enumerate(UPGRADE_PATHS):
+                for tier, upgrade in enumerate(self.upgrade_index.get(tower, {}).get(path, [])[:MAX_TIER + 1]):
+                    if upgrade is not None:
+                        costs[p, tier] = upgrade.cost[self.difficulty.value]
+            upgrade_costs[tower] = costs
+
+        # Score every legal upgrade step of every tower up front, so find_best_action only gathers from arrays
+        tower_rows = {tower: row for row, tower in enumerate(towers)}
+        step_costs = np.full((len(towers), len(CROSSPATHS), len(UPGRADE_PATHS)), -1, dtype=np.int64)
+        step_coverage = np.zeros(step_costs.shape, dtype=np.uint8)
+        step_scores = np.zeros(step_costs.shape)
+        for row, tower in enumerate(towers):
+            for column, tiers in enumerate(CROSSPATHS):
+                tower_obj = PlacedTower(tower=tower, position=(0, 0), upgrades=dict(zip(UPGRADE_PATHS, tiers)))
+                for p, path in enumerate(UPGRADE_PATHS):
+                    if NEXT_COLUMNS[column, p] < 0 or upgrade_costs[tower][p, tiers[p] + 1] < 0:
+                        continue
+                    step_costs[row, column, p] = upgrade_costs[tower][p, tiers[p] + 1]
+                    step_coverage[row, column, p] = self._get_upgraded_coverage_mask(tower_obj, path)
+                    step_scores[row, column, p] = self._compute_upgrade_order_score(tower_obj, path)
+
+        base_towers = [PlacedTower(tower=tower, position=(0, 0)) for tower in towers]
+        base_coverage = np.array([self.get_tower_coverage_mask(tower) for tower in base_towers], dtype=np.uint8)
+        row_placement_bonuses = np.array([
+            (1 + self.get_tower_dps_efficiency(tower) * 0.8) * (1 + self.evaluate_tower_future_value(tower) * 0.8)
+            for tower in towers
+        ])
+
+        return StrategyTables(
+            upgrade_costs, tower_rows, base_coverage, row_placement_bonuses, step_costs, step_coverage, step_scores
+        )
 
-            desired_ratio = COVERAGE_RATIOS.get(ctype, 0.0)
-            current_ratio = coverage_ratios.get(ctype, 0.0)
+    def get_strategy_tables(self) -> StrategyTables:
+        """Tables for the current difficulty, built the first time that difficulty is used."""
+        tables = self._strategy_tables.get(self.difficulty)
+        if tables is None:
+            tables = self._strategy_tables[self.difficulty] = self._build_strategy_tables()
+        return tables
+
+    def get_placement_weights(
+            self,
+            rows: np.ndarray,
+            ratio_deficits: np.ndarray,
+            same_type_counts: np.ndarray
+    ) -> np.ndarray:
+        """
+        Everything a placement's flow point coverage is multiplied by, for the towers at strategy table <rows>
+        (given the coverage deficits and how many of each of those towers are already placed).
+        """
+        tables = self.get_strategy_tables()
 
-            # Reward towers that help underrepresented coverage types
-            ratio_deficit = max(0.0, desired_ratio - current_ratio)
-            coverage_weight += (ratio_deficit ** 1.5) * 2
+        # --- Weight what each tower *provides* in coverage by what we *need more of* ---
+        # Reward towers that help underrepresented coverage types
+        tower_cov = COVERAGE_MASK_BITS[tables.base_coverage[rows]]
+        coverage_weights = tower_cov @ ((ratio_deficits ** 1.5) * 2)
 
         # Don't let coverage entirely ignore high-dps towers
-        coverage_weight = max(coverage_weight, 0.1)
+        coverage_weights = np.maximum(coverage_weights, 0.1)
 
         # Penalize adding too many of the same tower
-        same_type_count = sum(1 for t in self.placed_towers if t.tower == tower)
-        duplicate_penalty = 1 / (1 + same_type_count)
-
-        # Reward DPS efficiency (low cost/dps ratio)
-        dps_eff_bonus = 1 + self.get_tower_dps_efficiency(tower) * 0.8
+        duplicate_penalties = 1 / (1 + same_type_counts)
+
+        # Reward DPS efficiency (low cost/dps ratio) and potential future value for the tower
+        return coverage_weights * duplicate_penalties * tables.row_placement_bonuses[rows]
+
+    def get_placement_weight(
+            self,
+            tower: Tower,
+            coverage_ratios: dict[CoverageType, float],
+            same_type_count: int | None = None
+    ) -> float:
+        """get_placement_weights for a single tower."""
+        if same_type_count is None:
+            same_type_count = self.tower_type_counts[tower]
+        rows = np.array([self.get_strategy_tables().tower_rows[tower]])
+        ratio_deficits = self.get_coverage_deficits(coverage_ratios)
+        return float(self.get_placement_weights(rows, ratio_deficits, np.array([same_type_count]))[0])
+
+    def get_placement_bias(self) -> float:
+        """Factor on every placement score: punish tower placements more as more towers are placed."""
+        return max(0.05, 1.0 - len(self.placed_towers) * 0.1)
 
-        # Reward potential future value for the tower
-        future_value_bonus = 1 + self.evaluate_tower_future_value(tower) * 0.8
+    @staticmethod
+    def evaluate_upgrades(
+            next_tiers: np.ndarray,
+            upgraded_coverage: np.ndarray,
+            order_scores: np.ndarray,
+            ratio_deficits: np.ndarray
+    ) -> np.ndarray:
+        """
+        Score of upgrades (arrays of any matching shape), from the tier each one reaches, the tower's coverage mask
+        after it and its upgrade order score (see _compute_upgrade_order_score).
+        """
+        # Reward higher tier upgrades
+        scores = 1.0 + next_tiers * 0.5
 
-        score = track_coverage_score * coverage_weight * duplicate_penalty * dps_eff_bonus * future_value_bonus
+        # Coverage incentives (prefer upgrades that help weak coverage types)
+        # Reward closing the gap between current and desired
+        mask_deficits = COVERAGE_MASK_BITS @ ratio_deficits
+        ratio_incentives = mask_deficits[upgraded_coverage] * UPGRADE_COVERAGE_INCENTIVE
+        scores = scores * (1.0 + ratio_incentives)
 
-        return score
+        # Reward DPS gained per dollar (following the solved upgrade order)
+        return scores * (1 + order_scores * 100)
 
-    def evaluate_upgrade(self, tower_obj, path, coverage_ratios: dict[CoverageType, float]):
-        next_tier = tower_obj.upgrades[path] + 1
+    def _get_upgraded_coverage_mask(self, tower_obj: PlacedTower, path: str) -> int:
+        """Coverage mask the tower would have after its next upgrade on <path>."""
         upgrade = self.get_next_upgrade(tower_obj, path)
-        score = 1.0
-
-        # Reward higher tier upgrades
-        score += next_tier * 0.5
 
         # Tower coverage before upgrade
-        tower_coverage = self.get_tower_coverage(tower_obj)
+        tower_coverage = self.get_tower_coverage_mask(tower_obj)
 
         # Find coverage post-upgrade
-        upgraded_coverage = tower_coverage.copy()
-        if upgrade.get("grants_camo"):
-            upgraded_coverage[CoverageType.CAMO] = True
+        upgraded_coverage = tower_coverage
+        if upgrade.grants_camo:
+            upgraded_coverage |= COVERAGE_BITS[CoverageType.CAMO]
 
         # Compare coverage before and after
         tower_damage_type = self.get_tower_damage_type(tower_obj)
-        upgrade_damage_type = upgrade.get("Damage Type") or tower_damage_type
+        upgrade_damage_type = upgrade.damage_type or tower_damage_type
         if upgrade_damage_type != tower_damage_type:
-            base_pops = DAMAGE_TYPE_BY_COVERAGE[tower_damage_type]
-            upgrade_pops = DAMAGE_TYPE_BY_COVERAGE[upgrade_damage_type]
+            base_pops = DAMAGE_TYPE_COVERAGE_MASKS.get(tower_damage_type, 0)
+            upgrade_pops = DAMAGE_TYPE_COVERAGE_MASKS.get(upgrade_damage_type, 0)
             # If upgrade pops more types, add those to coverage
-            for bloon_type in upgrade_pops - base_pops:
-                upgraded_coverage[bloon_type] = True
-
-        # Coverage incentives (prefer upgrades that help weak coverage types)
-        ratio_incentive = 0.0
-        for ctype, has_coverage in upgraded_coverage.items():
-            if not has_coverage:
-                continue
-            current_ratio = coverage_ratios.get(ctype, 0.0)
-            desired_ratio = COVERAGE_RATIOS.get(ctype, 0.0)
-
-            # Reward closing the gap between current and desired
-            if current_ratio < desired_ratio:
-                gap = desired_ratio - current_ratio
-                ratio_incentive += gap * 1.5  # ADJUST THIS IF NECESSARY!
+            upgraded_coverage |= upgrade_pops & ~base_pops
 
-        score *= (1.0 + ratio_incentive)
-
-        return score
+        return upgraded_coverage
 
     def find_best_action(self, tower_list: list[Tower], allow_placement: bool):
+        """
+        Return the best-scoring action as (kind, subject, target, score), or None if nothing is affordable.
+        Placement targets are pixels on the track masks, as place_tower and place_hero take them.
+        Placement and upgrade candidates are scored as arrays and the best is picked with argmax. Scores are
+        memoized between calls (see ACTION MEMO), so a cycle where only money changed just re-filters affordability.
+        """
+        money = self.money
+        if money is None:
+            return None
+        self._refresh_action_memo()
         actions = []
-        coverage_ratios = self.get_coverage_ratios()
-        tower_count = len(self.placed_towers)
-
-        # Punish tower placements more as more towers are placed
-        placement_bias = max(0.05, 1.0 - tower_count * 0.1)
+        scores = []
 
         # Hero placement
         if not self.hero_placed and self.selected_hero:
             cost = self.get_tower_cost(self.selected_hero)
-            if self.money >= cost:
-                pos = self.find_best_placement(self.selected_hero)
+            if money >= cost:
+                placement = self._get_memo_placements([self.selected_hero])[self.selected_hero]
+                if placement is None:
+                    raise RuntimeError(f"No valid placement found for {self.selected_hero.value}.")
                 # Prioritize hero placement as early as possible
-                actions.append(("place_hero", self.selected_hero, pos, 9999999999))
+                actions.append(("place_hero", self.selected_hero, placement[0]))
+                scores.append(np.array([9999999999.0]))
 
         # Tower placements
         if allow_placement:
-            for tower in tower_list:
-                cost = self.get_tower_cost(tower)
-                if self.money < cost:
-                    continue
-
+            affordable = [tower for tower in tower_list if money >= self.get_tower_cost(tower)]
+            placements = self._get_memo_placements(affordable)
+            candidates = []
+            for tower in affordable:
                 # Skip towers that cannot be placed anywhere on this map
-                if not self.can_place_tower_on_map(tower):
+                if placements[tower] is None:
                     vprint(f"Skipping {tower.value} — no valid placement area.")
                     continue
+                candidates.append(tower)
+            actions.extend(("place", tower, placements[tower][0]) for tower in candidates)
+            scores.append(self._score_placements(candidates, placements))
 
-                pos = self.find_best_placement(tower)
-                score = self.evaluate_tower_placement(tower, pos, coverage_ratios) * placement_bias
-
-                actions.append(("place", tower, pos, score))
+        # Tower upgrades (illegal crosspaths, maxed paths and missing upgrades all have a cost of -1)
+        costs = self._memo_upgrade_costs
+        upgrade_towers, upgrade_paths = np.nonzero((costs >= 0) & (costs <= money))
+        scores.append(self._memo_upgrade_scores[upgrade_towers, upgrade_paths])
 
-        # Tower upgrades
-        for placed in self.placed_towers:
-            for path in ("top", "middle", "bottom"):
-                current_tier = placed.upgrades[path]
+        scores = np.concatenate(scores)
+        if scores.size == 0:
+            return None  # nothing to do
 
-                # Skip if this path is already maxed
-                if current_tier >= 5:
+        # Pick the best-scoring action
+        best = int(np.argmax(scores))
+        if best < len(actions):
+            return *actions[best], float(scores[best])
+        best -= len(actions)
+        placed = self.placed_towers[upgrade_towers[best]]
+        return "upgrade", placed, UPGRADE_PATHS[upgrade_paths[best]], float(scores[len(actions) + best])
+
+    def _score_placements(self, towers: list[Tower], placements: dict) -> np.ndarray:
+        """Score of memoized placements: weighted flow point coverage times the placement weight and bias."""
+        rows = [self.get_strategy_tables().tower_rows[tower] for tower in towers]
+        track_coverage_scores = np.array([placements[tower][2] for tower in towers])
+        return track_coverage_scores * self._memo_placement_weights[rows]
+
+    ############## ACTION MEMO ##############
+
+    def _reset_action_memo(self):
+        """
+        Drop everything find_best_action has memoized. Entries are otherwise invalidated piecemeal:
+        a new tower (or hero) drops the placements it overlaps, and any change to the placed towers marks the
+        coverage-dependent scores and that tower's upgrade entries dirty.
+        """
+        # {tower: (pixel position, footprint, track coverage score) or None if it can't fit}
+        self._memo_placements: dict[Tower | Hero, tuple | None] = {}
+        self._memo_path_profile: PathProfile | None = None
+        # Per tower row: get_placement_weights times the placement bias
+        self._memo_placement_weights = np.zeros(0)
+        # Per placed tower and path: cost of the next upgrade, the tier it reaches, its upgrade order score, the
+        # coverage mask after it and its evaluate_upgrades score
+        self._memo_upgrade_costs = np.zeros((0, len(UPGRADE_PATHS)), dtype=np.int64)
+        self._memo_upgrade_tiers = np.zeros((0, len(UPGRADE_PATHS)), dtype=np.int8)
+        self._memo_upgrade_orders = np.zeros((0, len(UPGRADE_PATHS)))
+        self._memo_upgrade_coverage = np.zeros((0, len(UPGRADE_PATHS)), dtype=np.uint8)
+        self._memo_upgrade_scores = np.zeros((0, len(UPGRADE_PATHS)))
+        self._memo_dirty_towers: set[int] = set()
+        self._memo_ratios_dirty = True
+
+    def _invalidate_memo_placements(self):
+        """Drop memoized placements that a newly occupied area overlaps (the rest are still the best spot)."""
+        for tower, placement in list(self._memo_placements.items()):
+            if placement is not None and self.occupancy.overlaps(placement[0], placement[1]):
+                del self._memo_placements[tower]
+
+    def _get_memo_placements(self, towers: list[Tower | Hero]) -> dict[Tower | Hero, tuple | None]:
+        """Memoized placement of each tower, searching only for towers without one."""
+        missing = [tower for tower in dict.fromkeys(towers) if tower not in self._memo_placements]
+        if missing:
+            for tower, placement in self.find_best_placements(missing).items():
+                if placement is None:
+                    self._memo_placements[tower] = None
                     continue
-                other_paths = [p for p in ("top", "middle", "bottom") if p != path]
-                other_tiers = [placed.upgrades[p] for p in other_paths]
-
-                # If both other paths are already upgraded, skip this path
-                if all(t > 0 for t in other_tiers):
+                (x, y), _ = placement
+                # Reward towers that cover more flow points, weighted by where along the path they are
+                track_coverage_score = self.flow_index.weighted_within(
+                    x, y, self.get_tower_range_px(tower), self.path_profile
+                )
+                self._memo_placements[tower] = ((x, y), self.get_tower_footprint(tower), track_coverage_score)
+        return {tower: self._memo_placements[tower] for tower in towers}
+
+    def _refresh_action_memo(self):
+        """Recompute whatever the state changes since the last call made dirty."""
+        if self.path_profile != self._memo_path_profile:
+            self._memo_placements.clear()
+            self._memo_path_profile = self.path_profile
+        tables = self.get_strategy_tables()
+
+        # Upgrade options of new and changed towers
+        count = len(self.placed_towers)
+        known = len(self._memo_upgrade_costs)
+        if known != count or self._memo_dirty_towers:
+            if known != count:
+                self._memo_ratios_dirty = True
+            costs = np.full((count, len(UPGRADE_PATHS)), -1, dtype=np.int64)
+            tiers = np.zeros(costs.shape, dtype=np.int8)
+            orders = np.zeros(costs.shape)
+            coverage = np.zeros(costs.shape, dtype=np.uint8)
+            kept = min(known, count)
+            costs[:kept] = self._memo_upgrade_costs[:kept]
+            tiers[:kept] = self._memo_upgrade_tiers[:kept]
+            orders[:kept] = self._memo_upgrade_orders[:kept]
+            coverage[:kept] = self._memo_upgrade_coverage[:kept]
+            for i, placed in enumerate(self.placed_towers):
+                if i < kept and id(placed) not in self._memo_dirty_towers:
+                    continue
+                costs[i] = -1
+                row = tables.tower_rows.get(placed.tower)
+                column = crosspath_column(placed.upgrades)
+                if row is None or column < 0:
                     continue
+                costs[i] = tables.step_costs[row, column]
+                tiers[i] = NEXT_TIERS[column]
+                orders[i] = tables.step_scores[row, column]
+                coverage[i] = tables.step_coverage[row, column]
+            self._memo_upgrade_costs = costs
+            self._memo_upgrade_tiers = tiers
+            self._memo_upgrade_orders = orders
+            self._memo_upgrade_coverage = coverage
+            self._memo_dirty_towers.clear()
+            self._memo_ratios_dirty = True
+
+        # Everything that depends on coverage ratios and tower counts
+        if self._memo_ratios_dirty:
+            ratio_deficits = self.get_coverage_deficits(self.get_coverage_ratios())
+            rows = np.arange(len(tables.tower_rows))
+            type_counts = np.zeros(len(rows))
+            for tower, row in tables.tower_rows.items():
+                type_counts[row] = self.tower_type_counts[tower]
+            self._memo_placement_weights = (
+                self.get_placement_weights(rows, ratio_deficits, type_counts) * self.get_placement_bias()
+            )
+            self._memo_upgrade_scores = self.evaluate_upgrades(
+                self._memo_upgrade_tiers, self._memo_upgrade_coverage, self._memo_upgrade_orders, ratio_deficits
+            )
+            self._memo_ratios_dirty = False
+
+    def plan_layout(
+            self,
+            towers: list[Tower] | None = None,
+            budget: int | None = None,
+            candidates_per_tower: int = 24
+    ) -> list[tuple[Tower, tuple[int, int], float]]:
+        """
+        Plan a whole layout in one call with lazy-greedy (CELF) selection. Nothing is placed in game.
+        - Without a budget, every tower in <towers> is placed once (list a tower twice to place it twice).
+        - With a <budget>, any of <towers> (default: all towers) can be picked repeatedly while the total cost fits,
+          and candidates are ranked by gain per dollar.
+        The gain of a placement is the number of flow points it newly covers, weighted by the
+        get_placement_weight criteria. Gains only shrink as the layout grows, so a stale gain is an upper bound
+        and candidates are only rescored when they reach the top of the queue.
+        Returns [(tower, pixel on the track masks, gain)] in placement order.
+        """
+        if self.placement_engine is None or self.flow_index is None:
+            raise RuntimeError("No track selected or flow points not loaded.")
+        if towers is None and budget is None:
+            raise ValueError("Provide towers to place, a budget, or both.")
 
-                # If another tier is already >2, this path can't go higher than 2
-                if max(other_tiers) >= 3 and current_tier == 2:
+        engine = self.placement_engine
+        h, w = engine.height, engine.width
+        remaining = Counter(towers) if budget is None else None
+        pool = list(dict.fromkeys(towers)) if towers is not None else [t for t in Tower if t.value in self.tower_data]
+
+        coverage_ratios = self.get_coverage_ratios()
+        type_counts = self.tower_type_counts.copy()
+        weights: dict[tuple[Tower, int], float] = {}
+
+        def gain_of(tower: Tower, covers: int, covered: int) -> float:
+            key = (tower, type_counts[tower])
+            if key not in weights:
+                weights[key] = self.get_placement_weight(tower, coverage_ratios, type_counts[tower])
+            return weights[key] * (covers & ~covered).bit_count()
+
+        def priority(tower: Tower, gain: float) -> float:
+            return gain / max(self.get_tower_cost(tower), 1) if budget is not None else gain
+
+        # Candidate positions (and the flow points each one covers, as a bitmask) per placement signature
+        candidates: dict[Tower, list[tuple[tuple[int, int], int]]] = {}
+        by_signature = {}
+        for tower in pool:
+            footprint, range_px, placement_type = self.get_placement_signature(tower)
+            signature = (footprint, range_px, placement_type)
+            if signature not in by_signature:
+                by_signature[signature] = []
+                positions = engine.candidate_placements(
+                    placement_type, footprint, range_px, self.occupancy, candidates_per_tower
+                )
+                for (x, y), _ in positions:
+                    covered_idx = self.flow_index.query_radius(x, y, range_px)
+                    bits = np.zeros(len(self.flow_index), dtype=bool)
+                    bits[covered_idx] = True
+                    covers = int.from_bytes(np.packbits(bits, bitorder="little").tobytes(), "little")
+                    by_signature[signature].append(((x, y), covers))
+            candidates[tower] = by_signature[signature]
+
+        # Priority queue of (-priority, tie-break, gain, tower, candidate index, layout size when scored)
+        queue = []
+        sequence = 0
+        for tower in pool:
+            for i, (_, covers) in enumerate(candidates[tower]):
+                gain = gain_of(tower, covers, 0)
+                if budget is not None and gain <= 0:
                     continue
+                queue.append((-priority(tower, gain), sequence, gain, tower, i, 0))
+                sequence += 1
+        heapq.heapify(queue)
+
+        planned = OccupancyIndex(h, w)
+        covered = 0
+        money_left = budget
+        layout = []
+        while queue:
+            _, _, gain, tower, i, scored_at = heapq.heappop(queue)
+            if remaining is not None and remaining[tower] == 0:
+                continue
+            if money_left is not None and self.get_tower_cost(tower) > money_left:
+                continue
+            (x, y), covers = candidates[tower][i]
 
-                try:
-                    upgrade = self.get_next_upgrade(placed, path)
-                    if upgrade:
-                        cost = upgrade["cost"][self.difficulty.value]
-                        if self.money < cost:
-                            continue
-                        dps_eff = self.evaluate_upgrade_dps_efficiency(placed, path)
-                        score = self.evaluate_upgrade(placed, path, coverage_ratios) * (1 + dps_eff * 100)
-
-                        actions.append(("upgrade", placed, path, score))
-                except Exception:
+            # Stale entry: rescore against the current layout and put it back
+            if scored_at != len(layout):
+                if planned.overlaps((x, y), self.get_tower_footprint(tower)):
                     continue
+                gain = gain_of(tower, covers, covered)
+                if budget is not None and gain <= 0:
+                    continue
+                heapq.heappush(queue, (-priority(tower, gain), sequence, gain, tower, i, len(layout)))
+                sequence += 1
+                continue
 
-        if not actions:
-            return None  # nothing to do
+            # Fresh and still on top, so it is the best marginal choice
+            layout.append((tower, (x, y), gain))
+            planned.add((x, y), self.get_tower_footprint(tower))
+            covered |= covers
+            type_counts[tower] += 1
+            if remaining is not None:
+                remaining[tower] -= 1
+            if money_left is not None:
+                money_left -= self.get_tower_cost(tower)
 
-        # Pick the best-scoring action
-        best_action = max(actions, key=lambda a: a[3])
-        return best_action
+        return layout
 
 
 def main():
@@ -907,12 +1270,12 @@ def main():
     cycle = 0
     while True:
         cycle += 1
-        current_screen = identify_screen(brain.window_manager.capture_window(force_focus=True))
+        current_screen = identify_screen_fast(brain.frames, force_focus=True)
         while current_screen != BloonsScreen.IN_GAME:
             print(f"Detected screen change ({current_screen}), waiting 5 seconds to confirm...")
             time.sleep(5)
 
-            recheck_screen = identify_screen(brain.window_manager.capture_window(force_focus=False))
+            recheck_screen = identify_screen_fast(brain.frames)
             if recheck_screen != BloonsScreen.IN_GAME:
                 print(f"Still not in-game after wait ({recheck_screen})")
                 if current_screen in (BloonsScreen.GAME_OVER_SCREEN_1, BloonsScreen.GAME_OVER_SCREEN_2):
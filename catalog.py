@@ -0,0 +1,234 @@
+import json
+import os
+import pickle
+import threading
+from dataclasses import dataclass
+
+from fingerprint import source_fingerprint
+from system_flags import vprint
+
+CATALOG_VERSION = 1
+CATALOG_CACHE_PATH = "data/catalog.cache"
+CATALOG_SOURCES = {
+    "towers": "data/combined_towers.json",
+    "upgrades": "data/merged_upgrades.json",
+    "heroes": "data/hero_properties.json",
+    "rounds": "data/rounds.json",
+}
+UPGRADE_PATH_NAMES = {1: "top", 2: "middle", 3: "bottom"}
+
+
+@dataclass(frozen=True, slots=True)
+class TowerSpec:
+    name: str
+    category: str
+    base_costs: tuple[int, ...]
+    base_range: float
+    base_sees_camo: bool
+    base_pops_lead: bool
+    placement_type: str
+    footprint_shape: str
+    footprint_radius: float | None
+    footprint_width: float | None
+    footprint_height: float | None
+    damage: float | None
+    cooldown: float | None
+    pierce: float | None
+    projectiles: float | None
+    damage_type: str | None
+
+
+@dataclass(frozen=True, slots=True)
+class UpgradeSpec:
+    path: int
+    tier: int
+    name: str
+    effect: str
+    cost: tuple[int, ...]
+    grants_camo: bool
+    grants_lead: bool
+    added_range: float
+    range: float | None
+    damage: float | None
+    cooldown: float | None
+    pierce: float | None
+    projectiles: float | None
+    damage_type: str | None
+
+
+@dataclass(frozen=True, slots=True)
+class HeroSpec:
+    name: str
+    category: str | None
+    base_costs: tuple[int, ...]
+    base_range: float
+    placement_type: str
+    footprint_shape: str
+    footprint_radius: float | None
+    footprint_width: float | None
+    footprint_height: float | None
+
+
+@dataclass(frozen=True, slots=True)
+class RoundSpec:
+    number: int
+    bloon_groups: tuple[tuple[str, int], ...]
+    rbe: int
+    cash: float
+    end_of_round_cash: float
+
+
+def _parse_number(text: str) -> float:
+    return float(text.replace(",", "").replace("$", "").strip() or 0)
+
+
+def _parse_tower(name: str, data: dict) -> TowerSpec:
+    return TowerSpec(
+        name=name,
+        category=data["category"],
+        base_costs=tuple(data["base_costs"]),
+        base_range=data["base_range"],
+        base_sees_camo=data["base_sees_camo"],
+        base_pops_lead=data["base_pops_lead"],
+        placement_type=data["placement_type"],
+        footprint_shape=data["footprint_shape"],
+        footprint_radius=data.get("footprint_radius"),
+        footprint_width=data.get("footprint_width"),
+        footprint_height=data.get("footprint_height"),
+        damage=data.get("damage"),
+        cooldown=data.get("cooldown"),
+        pierce=data.get("pierce"),
+        projectiles=data.get("projectiles"),
+        damage_type=data.get("damage_type", "Normal"),
+    )
+
+
+def _parse_upgrade(data: dict) -> UpgradeSpec:
+    return UpgradeSpec(
+        path=data["path"],
+        tier=data["tier"],
+        name=data["name"],
+        effect=data.get("effect", ""),
+        cost=tuple(data["cost"]),
+        grants_camo=data["grants_camo"],
+        grants_lead=data["grants_lead"],
+        added_range=data.get("added_range") or 0,
+        range=data.get("Range"),
+        damage=data.get("Damage"),
+        cooldown=data.get("Cooldown"),
+        pierce=data.get("Pierce"),
+        projectiles=data.get("Projectiles"),
+        damage_type=data.get("Damage Type"),
+    )
+
+
+def _parse_hero(name: str, data: dict) -> HeroSpec:
+    return HeroSpec(
+        name=name,
+        category=data.get("category"),
+        base_costs=tuple(data["base_costs"]),
+        base_range=data["base_range"],
+        placement_type=data["placement_type"],
+        footprint_shape=data["footprint_shape"],
+        footprint_radius=data.get("footprint_radius"),
+        footprint_width=data.get("footprint_width"),
+        footprint_height=data.get("footprint_height"),
+    )
+
+
+def _parse_round(data: dict) -> RoundSpec:
+    # Cash reads like "$1,071 + $161" (cash from pops + end of round bonus)
+    cash = [_parse_number(part) for part in data["cash"].split("+")] + [0.0, 0.0]
+    return RoundSpec(
+        number=int(data["round"]),
+        bloon_groups=tuple((group["type"], group["count"]) for group in data["bloon_groups"]),
+        rbe=int(_parse_number(data["rbe"])),
+        cash=cash[0],
+        end_of_round_cash=cash[1],
+    )
+
+
+class Catalog:
+    """
+    Tower, upgrade, hero and round data parsed into typed specs, shared by every brain in the process.
+    upgrade_index is {tower: {path name: [upgrade by tier]}} (index 0 is the unupgraded tower, so None).
+    """
+
+    __slots__ = ("towers", "upgrades", "heroes", "rounds", "upgrade_index", "crosspath_stats")
+
+    def __init__(
+            self,
+            towers: dict[str, TowerSpec],
+            upgrades: dict[str, tuple[UpgradeSpec, ...]],
+            heroes: dict[str, HeroSpec],
+            rounds: tuple[RoundSpec, ...]
+    ):
+        self.towers = towers
+        self.upgrades = upgrades
+        self.heroes = heroes
+        self.rounds = rounds
+        self.upgrade_index: dict[str, dict[str, list[UpgradeSpec | None]]] = {}
+        for tower, tower_upgrades in upgrades.items():
+            max_tier = max((upgrade.tier for upgrade in tower_upgrades), default=0)
+            paths = {path: [None] * (max_tier + 1) for path in UPGRADE_PATH_NAMES.values()}
+            for upgrade in tower_upgrades:
+                paths[UPGRADE_PATH_NAMES[upgrade.path]][upgrade.tier] = upgrade
+            self.upgrade_index[tower] = paths
+
+        # Compiled from the brain's stat rules by the first brain that needs it (not saved to the cache)
+        self.crosspath_stats = None
+
+    @classmethod
+    def from_sources(cls) -> "Catalog":
+        """Parse the JSON data files."""
+        data = {}
+        for key, path in CATALOG_SOURCES.items():
+            with open(path, "r", encoding="utf-8") as f:
+                data[key] = json.load(f)
+        return cls(
+            towers={name: _parse_tower(name, tower) for name, tower in data["towers"].items()},
+            upgrades={name: tuple(map(_parse_upgrade, upgrades)) for name, upgrades in data["upgrades"].items()},
+            heroes={name: _parse_hero(name, hero) for name, hero in data["heroes"].items()},
+            rounds=tuple(map(_parse_round, data["rounds"])),
+        )
+
+
+def load_catalog(cache_path: str = CATALOG_CACHE_PATH) -> Catalog:
+    """
+    Load the catalog from its pickle cache, or parse the JSON sources (and rewrite the cache) if the cache is
+    missing, from an older version, or any source file changed since it was written.
+    """
+    fingerprint = source_fingerprint(list(CATALOG_SOURCES.values()))
+    try:
+        with open(cache_path, "rb") as f:
+            version, cached_fingerprint, specs = pickle.load(f)
+        if version == CATALOG_VERSION and cached_fingerprint == fingerprint:
+            return Catalog(*specs)
+    except (OSError, EOFError, ValueError, TypeError, pickle.UnpicklingError, AttributeError, ImportError):
+        # Missing, unreadable, or pickled by an older version of the spec classes
+        pass
+
+    vprint("Building game data catalog...")
+    catalog = Catalog.from_sources()
+    tmp_path = cache_path + ".tmp"
+    try:
+        with open(tmp_path, "wb") as f:
+            specs = (catalog.towers, catalog.upgrades, catalog.heroes, catalog.rounds)
+            pickle.dump((CATALOG_VERSION, fingerprint, specs), f, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(tmp_path, cache_path)
+    except OSError as e:
+        vprint(f"Could not write the catalog cache ({e}), continuing uncached.")
+    return catalog
+
+
+_catalog: Catalog | None = None
+_catalog_lock = threading.Lock()
+
+
+def get_catalog() -> Catalog:
+    """The process-wide catalog (loaded on first use)."""
+    global _catalog
+    with _catalog_lock:
+        if _catalog is None:
+            _catalog = load_catalog()
+        return _catalog
@@ -0,0 +1,90 @@
+import itertools
+
+import numpy as np
+
+from data.enums import CoverageType, DamageType, COVERAGE_BITS, COVERAGE_RATIOS
+
+UPGRADE_PATHS = ("top", "middle", "bottom")
+MAX_TIER = 5
+DIFFICULTY_COUNT = 4
+
+# Codes stored in the compiled table (-1 is "no damage type")
+DAMAGE_TYPES = tuple(DamageType)
+DAMAGE_TYPE_CODES = {damage_type: code for code, damage_type in enumerate(DAMAGE_TYPES)}
+COVERAGE_TYPES = tuple(CoverageType)
+
+# Bit of each coverage type, every mask unpacked to one bool per type (row m is mask m), and desired DPS shares
+COVERAGE_BIT_VALUES = np.array([COVERAGE_BITS[ctype] for ctype in COVERAGE_TYPES])
+COVERAGE_MASK_BITS = (np.arange(1 << len(COVERAGE_TYPES))[:, None] >> np.arange(len(COVERAGE_TYPES))) & 1 > 0
+DESIRED_COVERAGE_RATIOS = np.array([COVERAGE_RATIOS.get(ctype, 0.0) for ctype in COVERAGE_TYPES])
+
+
+def is_legal_crosspath(tiers: tuple[int, int, int]) -> bool:
+    """At most two paths upgraded, and only one of them past tier 2."""
+    if any(tier < 0 or tier > MAX_TIER for tier in tiers):
+        return False
+    return sum(tier > 0 for tier in tiers) <= 2 and sum(tier > 2 for tier in tiers) <= 1
+
+
+# Every legal (top, middle, bottom) tier combination, and its column in the stats table
+CROSSPATHS = [tiers for tiers in itertools.product(range(MAX_TIER + 1), repeat=3) if is_legal_crosspath(tiers)]
+_CROSSPATH_COLUMNS = np.full((MAX_TIER + 1,) * 3, -1, dtype=np.int16)
+for _column, _tiers in enumerate(CROSSPATHS):
+    _CROSSPATH_COLUMNS[_tiers] = _column
+
+CROSSPATH_STATS_DTYPE = np.dtype([
+    ("dps", np.float64),
+    ("damage_type", np.int8),
+    ("coverage", np.uint8),
+    ("cost", np.int64, (DIFFICULTY_COUNT,)),
+    ("range", np.float64),
+])
+
+
+def crosspath_column(upgrades: dict[str, int]) -> int:
+    """Column of a tower's upgrade state in the stats table, or -1 if the state is not a legal crosspath."""
+    top, middle, bottom = upgrades["top"], upgrades["middle"], upgrades["bottom"]
+    if 0 <= top <= MAX_TIER and 0 <= middle <= MAX_TIER and 0 <= bottom <= MAX_TIER:
+        return int(_CROSSPATH_COLUMNS[top, middle, bottom])
+    return -1
+
+
+# Column reached from each crosspath state by upgrading each path (-1 if that would not be a legal crosspath),
+# and the tier that upgrade is
+NEXT_COLUMNS = np.array([
+    [crosspath_column({**dict(zip(UPGRADE_PATHS, tiers)), path: tiers[p] + 1}) for p, path in enumerate(UPGRADE_PATHS)]
+    for tiers in CROSSPATHS
+], dtype=np.int16)
+NEXT_TIERS = np.array(CROSSPATHS, dtype=np.int8) + 1
+
+
+def bits_to_coverage(bits: int) -> dict[CoverageType, bool]:
+    return {ctype: bool(bits & COVERAGE_BITS[ctype]) for ctype in COVERAGE_TYPES}
+
+
+class CrosspathStats:
+    """
+    Stats of every tower in every legal crosspath state, as one structured array of shape (towers, crosspaths).
+    Fields: cumulative dps, damage type code, coverage bitmask, cumulative cost per difficulty and effective range.
+    """
+
+    def __init__(self, towers: list[str], table: np.ndarray):
+        if table.shape != (len(towers), len(CROSSPATHS)):
+            raise ValueError(f"Stats table of shape {table.shape} doesn't match {len(towers)} towers.")
+        self.rows = {tower: row for row, tower in enumerate(towers)}
+        self.table = table
+
+    def __contains__(self, tower) -> bool:
+        return tower in self.rows
+
+    def lookup(self, tower, upgrades: dict[str, int]) -> np.void | None:
+        """Stats of <tower> with <upgrades>, or None if the tower or the state is not in the table."""
+        row = self.rows.get(tower)
+        if row is None:
+            return None
+        column = crosspath_column(upgrades)
+        return self.table[row, column] if column >= 0 else None
+
+    @staticmethod
+    def damage_type(code: int) -> DamageType | None:
+        return DAMAGE_TYPES[code] if code >= 0 else None
@@ -208,6 +208,19 @@ DAMAGE_TYPE_BY_COVERAGE = {
     DamageType.COLD: (CoverageType.BLACK, CoverageType.FROZEN, CoverageType.PURPLE),
 }
 
+# Coverage as an integer bitmask (bit i is the i-th CoverageType), and what each damage type pops as a mask
+COVERAGE_BITS = {ctype: 1 << bit for bit, ctype in enumerate(CoverageType)}
+DAMAGE_TYPE_COVERAGE_MASKS = {
+    damage_type: sum(COVERAGE_BITS[ctype] for ctype in ctypes)
+    for damage_type, ctypes in DAMAGE_TYPE_BY_COVERAGE.items()
+}
+
+
+class PathProfile(StrEnum):
+    UNIFORM = "Uniform"
+    EARLY = "Early"
+    LATE = "Late"
+
 
 class BloonsScreen(StrEnum):
     MAIN_MENU = "Main Menu"
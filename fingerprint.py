@@ -0,0 +1,26 @@
+import hashlib
+import json
+import os
+
+
+def source_fingerprint(paths: list[str]) -> dict[str, list[int]]:
+    """Return {file name: [mtime_ns, size]} for the source files a cache is derived from."""
+    fingerprint = {}
+    for path in paths:
+        stat = os.stat(path)
+        fingerprint[os.path.basename(path)] = [stat.st_mtime_ns, stat.st_size]
+    return fingerprint
+
+
+def content_fingerprint(paths: list[str]) -> dict[str, str]:
+    """
+    Return {file name: sha256 of its parsed contents} for JSON source files, for derived data that is committed to
+    the repository (checkouts reset modification times, so source_fingerprint would never match).
+    The JSON is re-serialized canonically before hashing, so line endings and formatting don't change the result.
+    """
+    fingerprint = {}
+    for path in paths:
+        with open(path, "r", encoding="utf-8") as f:
+            canonical = json.dumps(json.load(f), sort_keys=True, separators=(",", ":"))
+        fingerprint[os.path.basename(path)] = hashlib.sha256(canonical.encode("utf-8")).hexdigest()
+    return fingerprint
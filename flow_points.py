@@ -0,0 +1,140 @@
+import numpy as np
+
+from data.enums import PathProfile
+
+
+class FlowPointIndex:
+    """
+    Uniform grid hash over a track's flow points for "points within radius r of (x, y)" queries.
+    Points are sorted by cell (row-major), so every row of cells a query touches is one contiguous slice,
+    and a query only measures distances to points in nearby cells.
+    """
+
+    def __init__(self, flow_points, cell_size: int = 64):
+        self.points = np.asarray(flow_points, dtype=np.float64)
+        if self.points.ndim != 2 or self.points.shape[1] != 2:
+            raise ValueError("Flow points must be (x, y) pairs.")
+        self.cell_size = cell_size
+
+        cells_x = np.floor(self.points[:, 0] / cell_size).astype(np.int64)
+        cells_y = np.floor(self.points[:, 1] / cell_size).astype(np.int64)
+        self.origin = (int(cells_x.min(initial=0)), int(cells_y.min(initial=0)))
+        self.grid_width = int(cells_x.max(initial=0)) - self.origin[0] + 1
+        self.grid_height = int(cells_y.max(initial=0)) - self.origin[1] + 1
+
+        cell_ids = (cells_y - self.origin[1]) * self.grid_width + (cells_x - self.origin[0])
+        self._order = np.argsort(cell_ids, kind="stable")
+        self._sorted_points = self.points[self._order]
+        self._cell_start = np.searchsorted(cell_ids[self._order], np.arange(self.grid_width * self.grid_height + 1))
+
+        # Arc-length parameterisation of the path, and prefix sums of each profile's per-point weights
+        self.arc_length, self.path_fraction = self._parameterise()
+        self._weight_prefix = {profile: self._weight_prefix_table(profile) for profile in PathProfile}
+
+    def __len__(self):
+        return len(self.points)
+
+    @property
+    def nbytes(self) -> int:
+        arrays = [self.points, self._order, self._sorted_points, self._cell_start, self.arc_length, self.path_fraction]
+        return sum(array.nbytes for array in arrays) + sum(prefix.nbytes for prefix in self._weight_prefix.values())
+
+    def _parameterise(self) -> tuple[np.ndarray, np.ndarray]:
+        """Return the distance along the path to each point, and that distance as a fraction of the path length."""
+        segments = np.hypot(*np.diff(self.points, axis=0).T) if len(self.points) > 1 else np.zeros(0)
+        arc_length = np.concatenate(([0.0], np.cumsum(segments)))[:len(self.points)]
+        total = arc_length[-1] if len(arc_length) else 0.0
+        path_fraction = arc_length / total if total > 0 else np.zeros(len(self.points))
+        return arc_length, path_fraction
+
+    def _weight_prefix_table(self, profile: PathProfile) -> np.ndarray:
+        """
+        Prefix sums of per-point weights for <profile>.
+        Each point stands for the stretch of path halfway to its neighbours, so unevenly spaced points don't skew the
+        score, and the weights are scaled to sum to the number of points (UNIFORM on evenly spaced points is a count).
+        """
+        segments = np.diff(self.arc_length)
+        share = np.zeros(len(self.points))
+        share[:-1] += segments / 2
+        share[1:] += segments / 2
+        if not share.any():
+            share[:] = 1.0
+
+        if profile == PathProfile.EARLY:
+            weights = share * 2 * (1 - self.path_fraction)
+        elif profile == PathProfile.LATE:
+            weights = share * 2 * self.path_fraction
+        else:
+            weights = share
+
+        if weights.sum() > 0:
+            weights *= len(self.points) / weights.sum()
+        return np.concatenate(([0.0], np.cumsum(weights)))
+
+    def _candidate_pairs(self, centres: np.ndarray, radius: float) -> tuple[np.ndarray, np.ndarray]:
+        """
+        Return (centre index, sorted point position) for every point in a cell that overlaps a centre's query box.
+        """
+        ox, oy = self.origin
+        x0 = np.floor((centres[:, 0] - radius) / self.cell_size).astype(np.int64) - ox
+        x1 = np.floor((centres[:, 0] + radius) / self.cell_size).astype(np.int64) - ox
+        y0 = np.floor((centres[:, 1] - radius) / self.cell_size).astype(np.int64) - oy
+        y1 = np.floor((centres[:, 1] + radius) / self.cell_size).astype(np.int64) - oy
+
+        # Query boxes entirely off the grid contribute no cells
+        outside = (x1 < 0) | (x0 >= self.grid_width) | (y1 < 0) | (y0 >= self.grid_height)
+        x0, x1 = np.clip(x0, 0, self.grid_width - 1), np.clip(x1, 0, self.grid_width - 1)
+        y0, y1 = np.clip(y0, 0, self.grid_height - 1), np.clip(y1, 0, self.grid_height - 1)
+        row_counts = np.where(outside, 0, y1 - y0 + 1)
+
+        # One (centre, cell row) pair per row of cells each query box covers
+        pair_centres = np.repeat(np.arange(len(centres)), row_counts)
+        row_offsets = np.arange(row_counts.sum()) - np.repeat(np.cumsum(row_counts) - row_counts, row_counts)
+        rows = y0[pair_centres] + row_offsets
+        starts = self._cell_start[rows * self.grid_width + x0[pair_centres]]
+        ends = self._cell_start[rows * self.grid_width + x1[pair_centres] + 1]
+
+        # Expand every [start, end) slice into individual point positions
+        lengths = ends - starts
+        point_centres = np.repeat(pair_centres, lengths)
+        positions = np.arange(lengths.sum()) - np.repeat(np.cumsum(lengths) - lengths, lengths)
+        positions += np.repeat(starts, lengths)
+        return point_centres, positions
+
+    def _pairs_within(self, centres, radius: float) -> tuple[np.ndarray, np.ndarray]:
+        """Return (centre index, sorted point position) for every point strictly within <radius> of a centre."""
+        centres = np.asarray(centres, dtype=np.float64).reshape(-1, 2)
+        centre_idx, positions = self._candidate_pairs(centres, radius)
+        delta = self._sorted_points[positions] - centres[centre_idx]
+        inside = (delta[:, 0] ** 2 + delta[:, 1] ** 2) < radius ** 2
+        return centre_idx[inside], positions[inside]
+
+    def query_radius(self, x: float, y: float, radius: float) -> np.ndarray:
+        """Indices (ascending) of the flow points strictly within <radius> of (x, y)."""
+        _, positions = self._pairs_within((x, y), radius)
+        return np.sort(self._order[positions])
+
+    def count_within(self, x: float, y: float, radius: float) -> int:
+        """Number of flow points strictly within <radius> of (x, y)."""
+        _, positions = self._pairs_within((x, y), radius)
+        return len(positions)
+
+    def count_within_many(self, centres, radius: float) -> np.ndarray:
+        """Number of flow points strictly within <radius> of each (x, y) in <centres>."""
+        centres = np.asarray(centres, dtype=np.float64).reshape(-1, 2)
+        centre_idx, _ = self._pairs_within(centres, radius)
+        return np.bincount(centre_idx, minlength=len(centres))
+
+    def weighted_within(self, x: float, y: float, radius: float, profile: PathProfile = PathProfile.UNIFORM) -> float:
+        """
+        Summed <profile> weight of the flow points strictly within <radius> of (x, y).
+        Covered points form a few runs of consecutive path indices, and each run is one prefix table difference.
+        """
+        indices = self.query_radius(x, y, radius)
+        if len(indices) == 0:
+            return 0.0
+        breaks = np.flatnonzero(np.diff(indices) != 1)
+        run_starts = indices[np.concatenate(([0], breaks + 1))]
+        run_ends = indices[np.concatenate((breaks, [len(indices) - 1]))] + 1
+        prefix = self._weight_prefix[profile]
+        return float((prefix[run_ends] - prefix[run_starts]).sum())
@@ -0,0 +1,170 @@
+import threading
+import time
+from collections import deque
+from collections.abc import Callable
+from dataclasses import dataclass
+
+import numpy as np
+
+from interaction import WindowManager, grab_region, region_to_pixels
+from system_flags import FRAME_BUFFER_SIZE, FRAME_MAX_AGE_MS
+
+
+# Picks the pixels to probe for a window size: (width, height) -> (xs, ys) arrays of window coordinates
+Probe = Callable[[int, int], tuple[np.ndarray, np.ndarray]]
+
+
+@dataclass(frozen=True, slots=True)
+class Frame:
+    """
+    One capture of the game window, when it was grabbed (time.time()) and where: either a full (h, w, 3) RGB <image>,
+    or a probe capture holding only the (n, 3) RGB <pixels> that <probe> picks (see FrameService.get_pixels).
+    """
+    image: np.ndarray | None
+    timestamp: float
+    geometry: tuple[int, int, int, int]
+    probe: Probe | None = None
+    pixels: np.ndarray | None = None
+
+    @property
+    def age_ms(self) -> float:
+        return (time.time() - self.timestamp) * 1000
+
+    def sample(self, probe: Probe) -> np.ndarray | None:
+        """The pixels <probe> picks for this frame's size, as an (n, 3) array, or None if they weren't captured."""
+        if self.image is not None:
+            xs, ys = probe(self.geometry[2], self.geometry[3])
+            return self.image[ys, xs, :3]
+        return self.pixels if self.probe is probe else None
+
+    def crop(self, region: tuple[float, float, float, float]) -> np.ndarray:
+        """A window region of a full frame (fractions or pixels, as in WindowManager.capture_window)."""
+        x, y, width, height = region_to_pixels(region, self.geometry[2], self.geometry[3])
+        x, y, width, height = int(x), int(y), int(width), int(height)
+        return self.image[y:y + height, x:x + width]
+
+
+class FrameService:
+    """
+    Owns grabbing the game window and keeps the last few frames in a ring buffer, so consumers asking within a few
+    milliseconds of each other (screen checks, the money reader, navigation) share one grab and see the same
+    snapshot. Frames are grabbed on demand: a consumer asks for a frame no older than N ms (get_frame), for the
+    first frame after a given time (next_frame) or for a few pixels (get_pixels, e.g. screen checks), and only grabs
+    if no buffered frame qualifies. Pixel requests that no full frame can answer capture just those pixels, and
+    the probe capture is buffered too, so other checks in the same tick reuse it.
+    Thread-safe; while one consumer grabs, the others wait for and reuse that frame instead of grabbing again.
+    """
+
+    def __init__(self, window_manager: WindowManager, capacity: int = FRAME_BUFFER_SIZE):
+        self.window_manager = window_manager
+        self._frames: deque[Frame] = deque(maxlen=capacity)
+        self._lock = threading.Lock()  # Guards the ring buffer
+        self._grab_lock = threading.Lock()  # One grab at a time
+
+    def latest(self, max_age_ms: float | None = None) -> Frame | None:
+        """The newest buffered full frame (if it is no older than <max_age_ms>), without grabbing."""
+        return self._newest(max_age_ms, lambda frame: frame.image is not None)
+
+    def _newest(self, max_age_ms: float | None, accept: Callable[[Frame], bool]) -> Frame | None:
+        with self._lock:
+            frames = list(self._frames)
+        for frame in reversed(frames):
+            if max_age_ms is not None and frame.age_ms > max_age_ms:
+                return None
+            if accept(frame):
+                return frame
+        return None
+
+    def _first_after(self, after: float) -> Frame | None:
+        with self._lock:
+            return next((frame for frame in self._frames if frame.image is not None and frame.timestamp > after), None)
+
+    def get_frame(self, max_age_ms: float = FRAME_MAX_AGE_MS, force_focus: bool = False) -> Frame | None:
+        """
+        A frame no older than <max_age_ms>: the newest buffered one if it is fresh enough, otherwise a new grab.
+        Returns None if the window can't be captured.
+        """
+        frame = self.latest(max_age_ms)
+        if frame is not None:
+            return frame
+        with self._grab_lock:
+            # Another consumer may have grabbed while we waited
+            frame = self.latest(max_age_ms)
+            return frame if frame is not None else self._grab(force_focus)
+
+    def next_frame(self, after: float, force_focus: bool = False) -> Frame | None:
+        """
+        The first frame grabbed after <after> (a time.time() timestamp), e.g. to see the screen after a click.
+        Grabs (waiting until <after> if it is in the future) unless such a frame is already buffered.
+        Returns None if the window can't be captured.
+        """
+        frame = self._first_after(after)
+        if frame is not None:
+            return frame
+        with self._grab_lock:
+            frame = self._first_after(after)
+            if frame is not None:
+                return frame
+            delay = after - time.time()
+            if delay >= 0:
+                # Timestamps are taken before grabbing, so the grab must start strictly after <after>
+                time.sleep(delay + 0.001)
+            return self._grab(force_focus)
+
+    def get_pixels(
+            self,
+            probe: Probe,
+            max_age_ms: float = FRAME_MAX_AGE_MS,
+            force_focus: bool = False
+    ) -> tuple[Frame, np.ndarray] | None:
+        """
+        The pixels <probe> picks, from a frame no older than <max_age_ms>: a buffered full frame or an earlier
+        capture of the same probe (pass the same function object) if one is fresh enough, otherwise a new probe
+        capture of only those pixels (see WindowManager.capture_pixels), which is buffered for the next consumer.
+        Returns (frame, pixels), or None if the window can't be captured.
+        """
+        frame = self._newest(max_age_ms, lambda buffered: buffered.sample(probe) is not None)
+        if frame is not None:
+            return frame, frame.sample(probe)
+        with self._grab_lock:
+            frame = self._newest(max_age_ms, lambda buffered: buffered.sample(probe) is not None)
+            if frame is not None:
+                return frame, frame.sample(probe)
+            frame = self._grab_probe(probe, force_focus)
+            return (frame, frame.pixels) if frame is not None else None
+
+    def _grab_probe(self, probe: Probe, force_focus: bool) -> Frame | None:
+        """Capture only the pixels <probe> picks and publish them to the buffer (call with _grab_lock held)."""
+        if force_focus:
+            self.window_manager.focus_window()
+        geometry = self.window_manager.get_window_geometry()
+        if not geometry:
+            print("Cannot capture pixels — window not visible.")
+            return None
+        xs, ys = probe(geometry[2], geometry[3])
+        timestamp = time.time()
+        pixels = self.window_manager.capture_pixels(xs, ys)
+        if pixels is None:
+            return None
+        frame = Frame(None, timestamp, tuple(geometry), probe, pixels)
+        with self._lock:
+            self._frames.append(frame)
+        return frame
+
+    def _grab(self, force_focus: bool) -> Frame | None:
+        """Grab the whole window and publish it to the buffer (call with _grab_lock held)."""
+        if force_focus:
+            self.window_manager.focus_window()
+        geometry = self.window_manager.get_window_geometry()
+        if not geometry:
+            print("Cannot capture frame — window not visible.")
+            return None
+        timestamp = time.time()
+        frame = Frame(grab_region(*geometry), timestamp, tuple(geometry))
+        with self._lock:
+            self._frames.append(frame)
+        return frame
+
+    def clear(self):
+        with self._lock:
+            self._frames.clear()
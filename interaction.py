@@ -1,11 +1,15 @@
+import ctypes
 import enum
+import sys
 import time
+from functools import lru_cache
 
+import numpy as np
 import pyautogui as pgui
 import pydirectinput
 import pygetwindow as gw
 
-from system_flags import vprint, SUPPRESS_FOCUS_OUTPUT
+from system_flags import vprint, SUPPRESS_FOCUS_OUTPUT, PROBE_BOX_GAP
 
 
 class MouseButtons(enum.StrEnum):
@@ -138,6 +142,109 @@ class InputController:
             pgui.keyUp(key)
 
 
+############## PROBE CAPTURE ##############
+
+@lru_cache(maxsize=32)
+def probe_boxes(
+        xs: tuple[int, ...],
+        ys: tuple[int, ...],
+        max_gap: float
+) -> tuple[tuple[tuple[int, int, int, int], np.ndarray], ...]:
+    """
+    Group probe pixels into boxes to capture, as ((x0, y0, x1, y1), indices of the probes inside) pairs.
+    Probes within <max_gap> pixels of each other (on both axes) share a box; a gap of 0 gives every probe its own
+    pixel and an infinite gap gives one union bounding box.
+    """
+    points = np.column_stack([xs, ys])
+    # Single-linkage clustering (union-find over every close pair, there are only a few dozen probes)
+    parents = list(range(len(points)))
+
+    def root(i: int) -> int:
+        while parents[i] != i:
+            parents[i] = parents[parents[i]]
+            i = parents[i]
+        return i
+
+    for i in range(len(points)):
+        close = np.flatnonzero(np.abs(points[i + 1:] - points[i]).max(axis=1) <= max_gap) + i + 1
+        for j in close:
+            parents[root(int(j))] = root(i)
+
+    roots = np.array([root(i) for i in range(len(points))])
+    boxes = []
+    for cluster in dict.fromkeys(roots.tolist()):
+        indices = np.flatnonzero(roots == cluster)
+        (x0, y0), (x1, y1) = points[indices].min(axis=0), points[indices].max(axis=0) + 1
+        boxes.append(((int(x0), int(y0), int(x1), int(y1)), indices))
+    return tuple(boxes)
+
+
+if sys.platform == "win32":
+    class _BitmapInfoHeader(ctypes.Structure):
+        _fields_ = [
+            ("biSize", ctypes.c_uint32), ("biWidth", ctypes.c_int32), ("biHeight", ctypes.c_int32),
+            ("biPlanes", ctypes.c_uint16), ("biBitCount", ctypes.c_uint16), ("biCompression", ctypes.c_uint32),
+            ("biSizeImage", ctypes.c_uint32), ("biXPelsPerMeter", ctypes.c_int32),
+            ("biYPelsPerMeter", ctypes.c_int32), ("biClrUsed", ctypes.c_uint32), ("biClrImportant", ctypes.c_uint32),
+        ]
+
+    _user32, _gdi32 = ctypes.windll.user32, ctypes.windll.gdi32
+    for _function in (_user32.GetDC, _gdi32.CreateCompatibleDC, _gdi32.CreateCompatibleBitmap, _gdi32.SelectObject):
+        _function.restype = ctypes.c_void_p
+    _user32.ReleaseDC.argtypes = [ctypes.c_void_p, ctypes.c_void_p]
+    _gdi32.CreateCompatibleDC.argtypes = [ctypes.c_void_p]
+    _gdi32.CreateCompatibleBitmap.argtypes = [ctypes.c_void_p, ctypes.c_int, ctypes.c_int]
+    _gdi32.SelectObject.argtypes = [ctypes.c_void_p, ctypes.c_void_p]
+    _gdi32.BitBlt.argtypes = [ctypes.c_void_p] + [ctypes.c_int] * 4 + [ctypes.c_void_p] + [ctypes.c_int] * 2 + \
+                             [ctypes.c_uint32]
+    _gdi32.GetDIBits.argtypes = [ctypes.c_void_p, ctypes.c_void_p, ctypes.c_uint, ctypes.c_uint, ctypes.c_void_p,
+                                 ctypes.c_void_p, ctypes.c_uint]
+    _gdi32.DeleteObject.argtypes = [ctypes.c_void_p]
+    _gdi32.DeleteDC.argtypes = [ctypes.c_void_p]
+    _SRCCOPY = 0x00CC0020
+
+
+def grab_region(left: int, top: int, width: int, height: int) -> np.ndarray:
+    """
+    Capture one screen region as an (height, width, 3) RGB array.
+    On Windows only the region is copied from the screen (pyautogui grabs the whole screen and crops it).
+    """
+    if sys.platform != "win32":
+        return np.asarray(pgui.screenshot(region=(left, top, width, height)))[:, :, :3]
+
+    screen_dc = _user32.GetDC(None)
+    memory_dc = _gdi32.CreateCompatibleDC(screen_dc)
+    bitmap = _gdi32.CreateCompatibleBitmap(screen_dc, width, height)
+    try:
+        previous = _gdi32.SelectObject(memory_dc, bitmap)
+        _gdi32.BitBlt(memory_dc, 0, 0, width, height, screen_dc, left, top, _SRCCOPY)
+        _gdi32.SelectObject(memory_dc, previous)
+
+        # 32-bit BGRX rows, top-down (negative height)
+        header = _BitmapInfoHeader(ctypes.sizeof(_BitmapInfoHeader), width, -height, 1, 32, 0, 0, 0, 0, 0, 0)
+        pixels = np.empty((height, width, 4), dtype=np.uint8)
+        _gdi32.GetDIBits(memory_dc, bitmap, 0, height, pixels.ctypes.data, ctypes.byref(header), 0)
+    finally:
+        _gdi32.DeleteObject(bitmap)
+        _gdi32.DeleteDC(memory_dc)
+        _user32.ReleaseDC(None, screen_dc)
+    return pixels[:, :, 2::-1]
+
+
+def region_to_pixels(
+        region: tuple[float, float, float, float],
+        win_width: int,
+        win_height: int
+) -> tuple[int, int, int, int]:
+    """Window region (x, y, width, height) in pixels; values between 0 and 1 are fractions of the window size."""
+    rx, ry, rwidth, rheight = region
+    if 0 <= rx <= 1: rx = int(rx * win_width)
+    if 0 <= ry <= 1: ry = int(ry * win_height)
+    if 0 <= rwidth <= 1: rwidth = int(rwidth * win_width)
+    if 0 <= rheight <= 1: rheight = int(rheight * win_height)
+    return rx, ry, rwidth, rheight
+
+
 class WindowManager:
     def __init__(self, window_title: str):
         self.window_title = window_title
@@ -218,15 +325,7 @@ class WindowManager:
         win_left, win_top, win_width, win_height = geometry
 
         if region:
-            # Unpack region
-            rx, ry, rwidth, rheight = region
-
-            # If values are fractions (0 <= x <= 1), convert to pixels
-            if 0 <= rx <= 1: rx = int(rx * win_width)
-            if 0 <= ry <= 1: ry = int(ry * win_height)
-            if 0 <= rwidth <= 1: rwidth = int(rwidth * win_width)
-            if 0 <= rheight <= 1: rheight = int(rheight * win_height)
-
+            rx, ry, rwidth, rheight = region_to_pixels(region, win_width, win_height)
             left = win_left + rx
             top = win_top + ry
             width = rwidth
@@ -242,6 +341,33 @@ class WindowManager:
 
         return screenshot
 
+    def capture_pixels(
+            self,
+            xs: np.ndarray,
+            ys: np.ndarray,
+            force_focus: bool = False,
+            max_gap: float = PROBE_BOX_GAP
+    ) -> np.ndarray | None:
+        """
+        Capture only the given window pixels (probe mode), as an (n, 3) RGB array.
+        Nearby probes are grabbed together as one small box (see probe_boxes), so a few dozen probes cost a
+        few tiny captures instead of a full frame.
+        """
+        if force_focus:
+            self.focus_window()
+        geometry = self.get_window_geometry()
+        if not geometry:
+            print("Cannot capture pixels — window not visible.")
+            return None
+
+        win_left, win_top, _, _ = geometry
+        xs, ys = np.asarray(xs), np.asarray(ys)
+        pixels = np.zeros((len(xs), 3), dtype=np.uint8)
+        for (x0, y0, x1, y1), indices in probe_boxes(tuple(xs.tolist()), tuple(ys.tolist()), max_gap):
+            box = grab_region(win_left + x0, win_top + y0, x1 - x0, y1 - y0)
+            pixels[indices] = box[ys[indices] - y0, xs[indices] - x0]
+        return pixels
+
 
 def main():
     window_manager = WindowManager("BloonsTD6")
@@ -1,13 +1,24 @@
 import threading
 import time
 
+from frame_service import FrameService
+from system_flags import FRAME_MAX_AGE_MS
 from vision import ocr_number_from_image
 
 
 class MoneyReader:
-    def __init__(self, window_manager, region=(0.192, 0.015, 0.156, 0.049), interval=0.3):
-        self.window_manager = window_manager
+    """Reads the money counter by OCR from the shared window frames (see FrameService)."""
+
+    def __init__(
+            self,
+            frames: FrameService,
+            region=(0.192, 0.015, 0.156, 0.049),
+            interval=0.3,
+            max_age_ms: float = FRAME_MAX_AGE_MS
+    ):
+        self.frames = frames
         self.region = region
+        self.max_age_ms = max_age_ms
         self.interval = interval
         self._last_read: float = 0
         self._lock = threading.Lock()
@@ -18,20 +29,21 @@ class MoneyReader:
     def _loop(self):
         while not self._stop:
             try:
-                capture = self.window_manager.capture_window(region=self.region)
-                value = ocr_number_from_image(capture)
+                frame = self.frames.get_frame(self.max_age_ms)
+                value = ocr_number_from_image(frame.crop(self.region)) if frame is not None else None
                 if value is not None:
                     with self._lock:
                         self._money = value
                         print("READ MONEY:", value)
-                        self._last_read = time.time()
+                        # When the screen showed this value, not when OCR finished
+                        self._last_read = frame.timestamp
             except Exception as e:
                 print(f"[MoneyReader] OCR error: {e}")
             time.sleep(self.interval)
 
     def refresh_now(self):
-        capture = self.window_manager.capture_window(region=self.region)
-        value = ocr_number_from_image(capture)
+        frame = self.frames.next_frame(time.time())
+        value = ocr_number_from_image(frame.crop(self.region)) if frame is not None else None
         if value is not None:
             with self._lock:
                 self._money = value
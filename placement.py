@@ -0,0 +1,719 @@
+import json
+import os
+from dataclasses import dataclass
+from functools import lru_cache
+
+import cv2
+import numpy as np
+
+from fingerprint import source_fingerprint
+
+ATLAS_VERSION = 2
+ATLAS_MANIFEST = "manifest.json"
+
+
+@dataclass(frozen=True)
+class Footprint:
+    """A tower's footprint in pixels: a disc of <radius>, or a <width> x <height> rectangle."""
+    shape: str
+    radius: int = 0
+    width: int = 0
+    height: int = 0
+
+    def __post_init__(self):
+        if self.shape not in ("circular", "rectangular"):
+            raise ValueError(f"Unknown footprint shape: {self.shape}")
+
+    @property
+    def half_width(self) -> int:
+        return self.radius if self.shape == "circular" else self.width // 2
+
+    @property
+    def half_height(self) -> int:
+        return self.radius if self.shape == "circular" else self.height // 2
+
+    @property
+    def name(self) -> str:
+        if self.shape == "circular":
+            return f"circular_{self.radius}"
+        return f"rectangular_{self.width}x{self.height}"
+
+    def kernel(self) -> np.ndarray:
+        """Structuring element (uint8) centred on the tower position."""
+        if self.shape == "circular":
+            r = self.radius
+            yy, xx = np.mgrid[-r:r + 1, -r:r + 1]
+            return (xx * xx + yy * yy <= r * r).astype(np.uint8)
+        return np.ones((2 * self.half_height + 1, 2 * self.half_width + 1), dtype=np.uint8)
+
+
+def _erode(mask: np.ndarray, footprint: Footprint, outside: bool) -> np.ndarray:
+    """
+    Pixels where the whole <footprint> lies inside <mask> (off-screen pixels count as <outside>).
+    Discs use an exact Euclidean distance transform, which is much faster than a large disc kernel.
+    """
+    src = mask.astype(np.uint8)
+    if footprint.shape == "circular":
+        if outside:
+            clearance = cv2.distanceTransform(src, cv2.DIST_L2, cv2.DIST_MASK_PRECISE)
+        else:
+            # Surround the mask with a blocked border so the screen edge counts as an obstacle
+            padded = cv2.copyMakeBorder(src, 1, 1, 1, 1, cv2.BORDER_CONSTANT, value=0)
+            clearance = cv2.distanceTransform(padded, cv2.DIST_L2, cv2.DIST_MASK_PRECISE)[1:-1, 1:-1]
+        return clearance > footprint.radius
+    eroded = cv2.erode(
+        src, footprint.kernel(), borderType=cv2.BORDER_CONSTANT, borderValue=1 if outside else 0
+    )
+    return eroded > 0
+
+
+@lru_cache(maxsize=None)
+def _blocked_kernel(footprint: Footprint, free_footprint: Footprint) -> np.ndarray:
+    """
+    Offsets from a tower with <footprint> at which a tower with <free_footprint> would overlap it (read-only,
+    centred on the tower). Shared by every OccupancyIndex.
+    """
+    pad_x, pad_y = free_footprint.half_width, free_footprint.half_height
+    canvas = np.zeros((2 * (footprint.half_height + pad_y) + 1, 2 * (footprint.half_width + pad_x) + 1), dtype=np.uint8)
+    stamp = footprint.kernel()
+    canvas[pad_y:pad_y + stamp.shape[0], pad_x:pad_x + stamp.shape[1]] = stamp
+    kernel = ~_erode(canvas == 0, free_footprint, outside=True)
+    kernel.flags.writeable = False
+    return kernel
+
+
+class PackedMask:
+    """A boolean (h, w) mask stored 8 pixels per byte, packed along rows (np.packbits, big-endian bit order)."""
+
+    def __init__(self, bits: np.ndarray, width: int):
+        if bits.ndim != 2 or bits.shape[1] != -(-width // 8):
+            raise ValueError(f"Packed rows of {bits.shape[1]} bytes don't match a width of {width}.")
+        self.bits = bits
+        self.width = width
+
+    @classmethod
+    def zeros(cls, height: int, width: int) -> "PackedMask":
+        return cls(np.zeros((height, -(-width // 8)), dtype=np.uint8), width)
+
+    @property
+    def shape(self) -> tuple[int, int]:
+        return self.bits.shape[0], self.width
+
+    @property
+    def nbytes(self) -> int:
+        return self.bits.nbytes
+
+    def __getitem__(self, pos: tuple[int, int]) -> bool:
+        y, x = pos
+        return bool((self.bits[y, x >> 3] >> (7 - (x & 7))) & 1)
+
+    def any(self) -> bool:
+        return bool(self.bits.any())
+
+    def unpack(self) -> np.ndarray:
+        """The whole mask as a (h, w) boolean plane."""
+        return np.unpackbits(self.bits, axis=-1, count=self.width).view(bool)
+
+    def region(self, y0: int, y1: int, x0: int, x1: int) -> np.ndarray:
+        """Unpack only rows [y0, y1) and columns [x0, x1)."""
+        b0 = x0 >> 3
+        unpacked = np.unpackbits(self.bits[y0:y1, b0:-(-x1 // 8)], axis=-1).view(bool)
+        return unpacked[:, x0 - 8 * b0:x1 - 8 * b0]
+
+    def set_region(self, y0: int, x0: int, values: np.ndarray):
+        """OR a boolean block into the mask with its top-left corner at (x0, y0)."""
+        y1, x1 = y0 + values.shape[0], x0 + values.shape[1]
+        b0, b1 = x0 >> 3, -(-x1 // 8)
+        unpacked = np.unpackbits(self.bits[y0:y1, b0:b1], axis=-1).view(bool)
+        unpacked[:, x0 - 8 * b0:x1 - 8 * b0] |= values
+        self.bits[y0:y1, b0:b1] = np.packbits(unpacked, axis=-1)
+
+
+class OccupancyIndex:
+    """
+    Screen space taken up by placed towers (bit-packed) and the list of placed footprints.
+    A placed tower only blocks a small patch around itself for any other footprint, so "free" maps are built on
+    demand from those patches instead of keeping a full-resolution plane per footprint.
+    Also keeps a table of how many pixels are still placeable per (placement type, footprint), updated by add from
+    the pixels around each new tower only, and the block keys pyramid searches have already refined (see
+    PlacementEngine.best_placement_pyramid), of which add forgets only the blocks the new tower reaches.
+    """
+
+    def __init__(self, height: int, width: int):
+        self.height, self.width = height, width
+        self.occupied = PackedMask.zeros(height, width)
+        self._placed: list[tuple[tuple[int, int], Footprint]] = []
+        # Centre and (half width, half height) of every placed tower, for vectorised proximity tests
+        self._placed_centers = np.zeros((0, 2), dtype=np.int64)
+        self._placed_halves = np.zeros((0, 2), dtype=np.int64)
+        self._feasibility: dict[tuple[str, Footprint], np.ndarray] = {}
+        self._placeable_counts: dict[tuple[str, Footprint], int] = {}
+        self._block_keys: dict[tuple[str, Footprint, int, int], dict[int, int]] = {}
+
+    @property
+    def nbytes(self) -> int:
+        """Memory owned by the index (feasibility maps are the placement engine's, shared between brains)."""
+        return self.occupied.nbytes
+
+    def placeable_count(self, placement_type: str, footprint: Footprint, feasible: np.ndarray | None = None) -> int:
+        """
+        Number of pixels where a tower could still go. The first call for a (placement type, footprint) needs its
+        static <feasible> map; after that the count is kept up to date by add, so lookups are O(1).
+        """
+        key = (placement_type, footprint)
+        if key not in self._placeable_counts:
+            if feasible is None:
+                raise ValueError(f"No feasibility map registered for {placement_type} {footprint.name}.")
+            self._feasibility[key] = feasible
+            if self._placed:
+                feasible = feasible & self.free_map(footprint)
+            self._placeable_counts[key] = int(np.count_nonzero(feasible))
+        return self._placeable_counts[key]
+
+    def block_keys(self, placement_type: str, footprint: Footprint, range_px: int, block_size: int) -> dict[int, int]:
+        """
+        The refined key of every block a search for this signature has scored so far (block index -> key, see
+        PlacementEngine._refine_blocks). Keys depend on the placement engine, so an index must only be searched
+        with the engine of its own track.
+        """
+        return self._block_keys.setdefault((placement_type, footprint, int(range_px), block_size), {})
+
+    def free_map(self, footprint: Footprint) -> np.ndarray:
+        """Pixels where a tower with <footprint> would not overlap any occupied pixel (built on each call)."""
+        return self._free_region(footprint, 0, self.height, 0, self.width)
+
+    def _local_stamp(
+            self,
+            center: tuple[int, int],
+            footprint: Footprint,
+            pad_x: int,
+            pad_y: int
+    ) -> tuple[np.ndarray, int, int] | None:
+        """
+        Draw <footprint> at <center> on a canvas padded by (pad_x, pad_y) and crop it to the screen.
+        Returns (canvas, x0, y0) with the canvas' screen offset, or None if it is entirely off screen.
+        """
+        cx, cy = center
+        reach_x, reach_y = footprint.half_width + pad_x, footprint.half_height + pad_y
+        x0, x1 = max(cx - reach_x, 0), min(cx + reach_x + 1, self.width)
+        y0, y1 = max(cy - reach_y, 0), min(cy + reach_y + 1, self.height)
+        if x0 >= x1 or y0 >= y1:
+            return None
+
+        canvas = np.zeros((2 * reach_y + 1, 2 * reach_x + 1), dtype=np.uint8)
+        stamp = footprint.kernel()
+        canvas[pad_y:pad_y + stamp.shape[0], pad_x:pad_x + stamp.shape[1]] = stamp
+        ox, oy = cx - reach_x, cy - reach_y
+        return canvas[y0 - oy:y1 - oy, x0 - ox:x1 - ox], x0, y0
+
+    def overlaps(self, center: tuple[int, int], footprint: Footprint) -> bool:
+        """Return True if <footprint> at <center> touches any occupied pixel."""
+        stamp = self._local_stamp(center, footprint, 0, 0)
+        if stamp is None:
+            return False
+        local, x0, y0 = stamp
+        occupied = self.occupied.region(y0, y0 + local.shape[0], x0, x0 + local.shape[1])
+        return bool(np.any(occupied[local > 0]))
+
+    def _blocked_patch(
+            self,
+            center: tuple[int, int],
+            footprint: Footprint,
+            free_footprint: Footprint
+    ) -> tuple[np.ndarray, int, int]:
+        """
+        Pixels where <free_footprint> would overlap a tower with <footprint> at <center>, as (patch, x0, y0).
+        The tower must be at least partly on screen.
+        """
+        cx, cy = center
+        if (footprint.half_width <= cx < self.width - footprint.half_width
+                and footprint.half_height <= cy < self.height - footprint.half_height):
+            # Whole tower on screen: crop the shared kernel to the screen
+            kernel = _blocked_kernel(footprint, free_footprint)
+            reach_y, reach_x = kernel.shape[0] // 2, kernel.shape[1] // 2
+            x0, y0 = max(cx - reach_x, 0), max(cy - reach_y, 0)
+            x1, y1 = min(cx + reach_x + 1, self.width), min(cy + reach_y + 1, self.height)
+            return kernel[y0 - cy + reach_y:y1 - cy + reach_y, x0 - cx + reach_x:x1 - cx + reach_x], x0, y0
+
+        # Only the on-screen part of the tower is occupied
+        local, x0, y0 = self._local_stamp(center, footprint, free_footprint.half_width, free_footprint.half_height)
+        return ~_erode(local == 0, free_footprint, outside=True), x0, y0
+
+    def _free_region(self, footprint: Footprint, y0: int, y1: int, x0: int, x1: int) -> np.ndarray:
+        """free_map(<footprint>) in rows [y0, y1) and columns [x0, x1), from the placed towers that reach them."""
+        free = np.ones((y1 - y0, x1 - x0), dtype=bool)
+        for center, placed_footprint in self._placed:
+            reach_x = placed_footprint.half_width + footprint.half_width
+            reach_y = placed_footprint.half_height + footprint.half_height
+            if not (x0 - reach_x <= center[0] < x1 + reach_x and y0 - reach_y <= center[1] < y1 + reach_y):
+                continue
+            blocked, bx0, by0 = self._blocked_patch(center, placed_footprint, footprint)
+            by1, bx1 = by0 + blocked.shape[0], bx0 + blocked.shape[1]
+            iy0, iy1, ix0, ix1 = max(by0, y0), min(by1, y1), max(bx0, x0), min(bx1, x1)
+            if iy0 < iy1 and ix0 < ix1:
+                free[iy0 - y0:iy1 - y0, ix0 - x0:ix1 - x0] &= ~blocked[iy0 - by0:iy1 - by0, ix0 - bx0:ix1 - bx0]
+        return free
+
+    def free_blocks(self, footprint: Footprint, y0s: np.ndarray, x0s: np.ndarray, size: int) -> np.ndarray:
+        """
+        free_map(<footprint>) in <size> square windows with top-left corners (x0s[i], y0s[i]), as an (n, size, size)
+        array (pixels past the screen edge count as free). Only the (window, tower) pairs that can touch are drawn,
+        so the cost follows the towers near the windows rather than the number of towers or the screen size.
+        """
+        free = np.ones((len(y0s), size, size), dtype=bool)
+        if not self._placed:
+            return free
+
+        reach = self._placed_halves + (footprint.half_width, footprint.half_height)
+        cx, cy = self._placed_centers[:, 0], self._placed_centers[:, 1]
+        x0s, y0s = np.asarray(x0s)[:, None], np.asarray(y0s)[:, None]
+        near = (x0s - reach[:, 0] <= cx) & (cx < x0s + size + reach[:, 0]) & \
+               (y0s - reach[:, 1] <= cy) & (cy < y0s + size + reach[:, 1])
+        for i, j in zip(*np.nonzero(near)):
+            center, placed_footprint = self._placed[j]
+            blocked, bx0, by0 = self._blocked_patch(center, placed_footprint, footprint)
+            x0, y0 = int(x0s[i, 0]), int(y0s[i, 0])
+            iy0, iy1 = max(by0, y0), min(by0 + blocked.shape[0], y0 + size)
+            ix0, ix1 = max(bx0, x0), min(bx0 + blocked.shape[1], x0 + size)
+            if iy0 < iy1 and ix0 < ix1:
+                free[i, iy0 - y0:iy1 - y0, ix0 - x0:ix1 - x0] &= ~blocked[iy0 - by0:iy1 - by0, ix0 - bx0:ix1 - bx0]
+        return free
+
+    def add(self, center: tuple[int, int], footprint: Footprint):
+        """Mark a tower's footprint as occupied and remove the pixels it blocks from the placeable counts."""
+        stamp = self._local_stamp(center, footprint, 0, 0)
+        if stamp is None:
+            return
+
+        # Only pixels within reach of both footprints can become blocked
+        for free_footprint in {key_footprint for _, key_footprint in self._feasibility}:
+            blocked, x0, y0 = self._blocked_patch(center, footprint, free_footprint)
+            y1, x1 = y0 + blocked.shape[0], x0 + blocked.shape[1]
+            newly_blocked = blocked & self._free_region(free_footprint, y0, y1, x0, x1)
+            for (placement_type, key_footprint), feasible in self._feasibility.items():
+                if key_footprint == free_footprint:
+                    blocked_count = int(np.count_nonzero(newly_blocked & feasible[y0:y1, x0:x1]))
+                    self._placeable_counts[(placement_type, key_footprint)] -= blocked_count
+
+        # Forget the refined blocks the new tower can reach
+        cx, cy = center
+        for (_, key_footprint, _, block_size), keys in self._block_keys.items():
+            if not keys:
+                continue
+            reach_x = footprint.half_width + key_footprint.half_width
+            reach_y = footprint.half_height + key_footprint.half_height
+            bw = -(-self.width // block_size)
+            bx0, bx1 = max(cx - reach_x, 0) // block_size, min(cx + reach_x, self.width - 1) // block_size
+            by0, by1 = max(cy - reach_y, 0) // block_size, min(cy + reach_y, self.height - 1) // block_size
+            for by in range(by0, by1 + 1):
+                for bx in range(bx0, bx1 + 1):
+                    keys.pop(by * bw + bx, None)
+
+        local, x0, y0 = stamp
+        self.occupied.set_region(y0, x0, local > 0)
+        self._placed.append((center, footprint))
+        self._placed_centers = np.vstack([self._placed_centers, center])
+        self._placed_halves = np.vstack([self._placed_halves, (footprint.half_width, footprint.half_height)])
+
+
+class PlacementEngine:
+    """
+    Whole-track placement maps, computed with bulk array operations.
+    Every map is a full-resolution (h, w) array, so a placement query is a mask combination and one argmax
+    instead of a per-pixel scan.
+    """
+
+    def __init__(
+            self,
+            track: np.ndarray,
+            land: np.ndarray,
+            water: np.ndarray,
+            flow_points
+    ):
+        self.track = track
+        self.land = land
+        self.water = water
+        self.height, self.width = self.track.shape
+
+        self.flow_points = np.asarray(flow_points, dtype=np.float32)
+        if self.flow_points.ndim != 2 or self.flow_points.shape[1] != 2:
+            raise ValueError("Flow points must be (x, y) pairs.")
+
+        # Coverage counts are stored in the smallest dtype that can hold every flow point
+        self.coverage_dtype = np.min_scalar_type(len(self.flow_points))
+        self._flow_raster: np.ndarray | None = None
+
+        self._feasibility_cache: dict[tuple[str, Footprint], np.ndarray] = {}
+        self._coverage_cache: dict[int, np.ndarray] = {}
+        self._bound_cache: dict[tuple[str, Footprint, int, int], np.ndarray] = {}
+        self._block_order_cache: dict[tuple[str, Footprint, int, int], np.ndarray] = {}
+
+    ############## MAPS ##############
+
+    def terrain_mask(self, placement_type: str) -> np.ndarray:
+        """Return the boolean terrain mask for a placement type."""
+        if placement_type == "land":
+            return self.land
+        elif placement_type == "water":
+            return self.water
+        elif placement_type == "any":
+            return self.land | self.water
+        raise ValueError(f"Unknown placement type: {placement_type}")
+
+    def feasibility_map(self, placement_type: str, footprint: Footprint) -> np.ndarray:
+        """
+        Pixels where the whole footprint lies on valid terrain, off the track and on screen (ignores placed towers).
+        The terrain mask is eroded by the footprint's exact structuring element.
+        """
+        key = (placement_type, footprint)
+        if key not in self._feasibility_cache:
+            valid = self.terrain_mask(placement_type) & ~self.track
+            self._feasibility_cache[key] = _erode(valid, footprint, outside=False)
+        return self._feasibility_cache[key]
+
+    def coverage_map(self, range_px: int) -> np.ndarray:
+        """
+        Number of flow points strictly within <range_px> of every pixel.
+        Points are counted at the pixel they round to (see _get_flow_raster), so a point within half a pixel
+        diagonal (about 0.71 px) of the range boundary can be counted differently than by its exact distance
+        (FlowPointIndex.count_within). The map only ranks candidate pixels; the brain scores the chosen ones by exact
+        distance.
+        """
+        range_px = int(range_px)
+        if range_px not in self._coverage_cache:
+            self._coverage_cache[range_px] = self._compute_coverage(range_px)
+        return self._coverage_cache[range_px]
+
+    def _get_flow_raster(self) -> np.ndarray:
+        """Flow points rasterised onto the pixel grid (one count per point, at the nearest on-screen pixel)."""
+        if self._flow_raster is None:
+            raster = np.zeros((self.height, self.width), dtype=np.float32)
+            xs = np.clip(np.rint(self.flow_points[:, 0]).astype(np.int64), 0, self.width - 1)
+            ys = np.clip(np.rint(self.flow_points[:, 1]).astype(np.int64), 0, self.height - 1)
+            np.add.at(raster, (ys, xs), 1)
+            self._flow_raster = raster
+        return self._flow_raster
+
+    def _compute_coverage(self, range_px: int) -> np.ndarray:
+        if range_px <= 0:
+            return np.zeros((self.height, self.width), dtype=self.coverage_dtype)
+
+        # Ranges larger than the screen diagonal cover every flow point from anywhere
+        if range_px ** 2 > self.height ** 2 + self.width ** 2:
+            return np.full((self.height, self.width), len(self.flow_points), dtype=self.coverage_dtype)
+
+        # Convolve the flow point raster with an open disc (the kernel is symmetric, so correlation == convolution)
+        yy, xx = np.mgrid[-range_px:range_px + 1, -range_px:range_px + 1]
+        kernel = (xx * xx + yy * yy < range_px * range_px).astype(np.float32)
+        counts = cv2.filter2D(self._get_flow_raster(), cv2.CV_32F, kernel, borderType=cv2.BORDER_CONSTANT)
+        return np.rint(counts).astype(self.coverage_dtype)
+
+    ############## QUERIES ##############
+
+    def placeable_map(
+            self,
+            placement_type: str,
+            footprint: Footprint,
+            occupancy: OccupancyIndex | None = None
+    ) -> np.ndarray:
+        """Pixels where a tower can currently be placed (terrain, track clearance and placed towers)."""
+        feasible = self.feasibility_map(placement_type, footprint)
+        if occupancy is not None:
+            feasible = feasible & occupancy.free_map(footprint)
+        return feasible
+
+    def best_placement(
+            self,
+            placement_type: str,
+            footprint: Footprint,
+            range_px: int,
+            occupancy: OccupancyIndex | None = None,
+            sample_step: int = 1
+    ) -> tuple[tuple[int, int], int] | None:
+        """
+        Return ((x, y), score) for the feasible pixel covering the most flow points, or None if nothing fits.
+        Ties resolve to the first pixel in row-major order. <sample_step> > 1 only considers every n-th pixel.
+        """
+        feasible = self.placeable_map(placement_type, footprint, occupancy)
+        coverage = self.coverage_map(range_px)
+        if sample_step > 1:
+            feasible = feasible[::sample_step, ::sample_step]
+            coverage = coverage[::sample_step, ::sample_step]
+
+        scores = np.where(feasible, coverage, np.int32(-1))
+        idx = int(np.argmax(scores))
+        best_score = int(scores.flat[idx])
+        if best_score < 0:
+            return None
+
+        y, x = divmod(idx, scores.shape[1])
+        return (x * sample_step, y * sample_step), best_score
+
+    def block_bounds(self, placement_type: str, footprint: Footprint, range_px: int, block_size: int) -> np.ndarray:
+        """
+        Coarse pyramid level: the best feasible coverage inside every <block_size> square block (-1 if none).
+        Placed towers only remove pixels, so this is an upper bound on every block at any point in a game.
+        """
+        key = (placement_type, footprint, int(range_px), block_size)
+        if key not in self._bound_cache:
+            feasible = self.feasibility_map(placement_type, footprint)
+            scores = np.where(feasible, self.coverage_map(range_px), np.int32(-1))
+            bh, bw = -(-self.height // block_size), -(-self.width // block_size)
+            padded = np.full((bh * block_size, bw * block_size), -1, dtype=np.int32)
+            padded[:self.height, :self.width] = scores
+            self._bound_cache[key] = padded.reshape(bh, block_size, bw, block_size).max(axis=(1, 3))
+        return self._bound_cache[key]
+
+    def _block_order(self, placement_type: str, footprint: Footprint, range_px: int, block_size: int) -> np.ndarray:
+        """Block indices by descending bound, row-major among equal bounds (also the order of their first pixel)."""
+        key = (placement_type, footprint, int(range_px), block_size)
+        if key not in self._block_order_cache:
+            bounds = self.block_bounds(placement_type, footprint, range_px, block_size).ravel()
+            self._block_order_cache[key] = np.argsort(-bounds, kind="stable")
+        return self._block_order_cache[key]
+
+    def _refine_blocks(
+            self,
+            blocks: np.ndarray,
+            block_size: int,
+            placement_type: str,
+            footprint: Footprint,
+            coverage: np.ndarray,
+            occupancy: OccupancyIndex | None = None
+    ) -> np.ndarray:
+        """
+        Score <blocks> at full resolution (edge blocks are clipped to the screen). Returns one key per block that
+        encodes (score, earliest pixel) in a single integer, so an argmax resolves ties like the full scan (-1 if
+        nothing in the block is placeable). Decode keys with _decode_key.
+        Placed towers are only drawn into the refined blocks, never into a full-screen free map.
+        """
+        bw = -(-self.width // block_size)
+        pixel_count = self.height * self.width
+        offsets = np.arange(block_size)
+        y0s, x0s = blocks // bw * block_size, blocks % bw * block_size
+        ys = np.minimum(y0s[:, None, None] + offsets[None, :, None], self.height - 1)
+        xs = np.minimum(x0s[:, None, None] + offsets[None, None, :], self.width - 1)
+        ok = self.feasibility_map(placement_type, footprint)[ys, xs]
+        if occupancy is not None:
+            free = occupancy.free_blocks(footprint, y0s, x0s, block_size)
+            ok &= free[np.arange(len(blocks))[:, None, None], ys - y0s[:, None, None], xs - x0s[:, None, None]]
+
+        flat = ys.astype(np.int64) * self.width + xs
+        keys = np.where(ok, coverage[ys, xs].astype(np.int64) * pixel_count + (pixel_count - 1 - flat), -1)
+        return keys.reshape(len(blocks), -1).max(axis=1)
+
+    def _refined_keys(
+            self,
+            blocks: np.ndarray,
+            block_size: int,
+            placement_type: str,
+            footprint: Footprint,
+            range_px: int,
+            occupancy: OccupancyIndex | None
+    ) -> np.ndarray:
+        """_refine_blocks, reusing the keys <occupancy> kept from earlier searches and remembering the new ones."""
+        coverage = self.coverage_map(range_px)
+        if occupancy is None:
+            return self._refine_blocks(blocks, block_size, placement_type, footprint, coverage)
+
+        known = occupancy.block_keys(placement_type, footprint, range_px, block_size)
+        keys = np.array([known.get(block, -2) for block in blocks.tolist()], dtype=np.int64)
+        missing = keys == -2
+        if missing.any():
+            keys[missing] = self._refine_blocks(
+                blocks[missing], block_size, placement_type, footprint, coverage, occupancy
+            )
+            known.update(zip(blocks[missing].tolist(), keys[missing].tolist()))
+        return keys
+
+    def _decode_key(self, key: int) -> tuple[tuple[int, int], int]:
+        pixel_count = self.height * self.width
+        score, idx = divmod(int(key), pixel_count)
+        y, x = divmod(pixel_count - 1 - idx, self.width)
+        return (x, y), score
+
+    def best_placement_pyramid(
+            self,
+            placement_type: str,
+            footprint: Footprint,
+            range_px: int,
+            occupancy: OccupancyIndex | None = None,
+            block_size: int = 16,
+            top_k: int = 16
+    ) -> tuple[tuple[int, int], int] | None:
+        """
+        Coarse-to-fine version of best_placement (same result as the exhaustive 1 px search).
+        Blocks are visited in order of their coverage upper bound, <top_k> at a time, and only those blocks
+        are scored at full resolution. The search stops once no remaining block can beat (or tie earlier than)
+        the best pixel found so far.
+        """
+        bounds = self.block_bounds(placement_type, footprint, range_px, block_size).ravel()
+        order = self._block_order(placement_type, footprint, range_px, block_size)
+        bw = -(-self.width // block_size)
+
+        best_key = -1
+        for start in range(0, len(order), top_k):
+            # Stop once the next block can't contain a better (or equal and earlier) pixel
+            head = int(order[start])
+            head_bound = int(bounds[head])
+            if head_bound < 0:
+                break
+            if best_key >= 0:
+                (best_x, best_y), best_score = self._decode_key(best_key)
+                head_first_pixel = (head // bw) * block_size * self.width + (head % bw) * block_size
+                if head_bound < best_score or (
+                        head_bound == best_score and head_first_pixel >= best_y * self.width + best_x):
+                    break
+
+            blocks = order[start:start + top_k]
+            keys = self._refined_keys(blocks, block_size, placement_type, footprint, range_px, occupancy)
+            best_key = max(best_key, int(keys.max()))
+
+        if best_key < 0:
+            return None
+        return self._decode_key(best_key)
+
+    def candidate_placements(
+            self,
+            placement_type: str,
+            footprint: Footprint,
+            range_px: int,
+            occupancy: OccupancyIndex | None = None,
+            count: int = 24,
+            block_size: int = 64
+    ) -> list[tuple[tuple[int, int], int]]:
+        """
+        Up to <count> spread-out placement candidates: the best placeable pixel in each of the
+        highest-bound <block_size> blocks, as ((x, y), score), best first.
+        """
+        bounds = self.block_bounds(placement_type, footprint, range_px, block_size).ravel()
+        order = self._block_order(placement_type, footprint, range_px, block_size)
+        blocks = order[:count]
+        blocks = blocks[bounds[blocks] >= 0]
+        if blocks.size == 0:
+            return []
+
+        keys = self._refined_keys(blocks, block_size, placement_type, footprint, range_px, occupancy)
+        keys = np.sort(keys[keys >= 0])[::-1]
+        return [self._decode_key(key) for key in keys]
+
+    def best_placements(
+            self,
+            signatures,
+            occupancy: OccupancyIndex | None = None
+    ) -> dict[tuple[Footprint, int, str], tuple[tuple[int, int], int] | None]:
+        """
+        Answer best_placement for many (footprint, range, placement_type) signatures at once.
+        Each signature goes through the pyramid search, which gives the same answer but only refines the blocks
+        that can hold the best pixel (and, with an occupancy index, reuses the blocks no new tower has reached).
+        """
+        return {
+            (footprint, range_px, placement_type):
+                self.best_placement_pyramid(placement_type, footprint, range_px, occupancy)
+            for footprint, range_px, placement_type in signatures
+        }
+
+    ############## MEMORY ##############
+
+    def _arrays(self) -> list[np.ndarray]:
+        arrays = [self.track, self.land, self.water, self.flow_points]
+        arrays += [*self._feasibility_cache.values(), *self._coverage_cache.values()]
+        arrays += [*self._bound_cache.values(), *self._block_order_cache.values()]
+        if self._flow_raster is not None:
+            arrays.append(self._flow_raster)
+        return arrays
+
+    @property
+    def nbytes(self) -> int:
+        """Bytes held by the masks and every cached map (memory-mapped maps included)."""
+        return sum(array.nbytes for array in self._arrays())
+
+    def load_into_memory(self):
+        """Copy every memory-mapped map into RAM, so later queries never touch the disk."""
+        def copy(array: np.ndarray) -> np.ndarray:
+            return np.array(array) if isinstance(array, np.memmap) else array
+
+        self.track, self.land, self.water = copy(self.track), copy(self.land), copy(self.water)
+        self.flow_points = copy(self.flow_points)
+        for cache in (self._feasibility_cache, self._coverage_cache):
+            for key, array in cache.items():
+                cache[key] = copy(array)
+
+    ############## ATLAS (DISK CACHE) ##############
+
+    def precompute(self, signatures) -> bool:
+        """
+        Compute the feasibility and coverage maps for every (footprint, range, placement_type) signature.
+        Returns True if any map was missing (so the atlas should be saved again).
+        """
+        map_count = len(self._feasibility_cache) + len(self._coverage_cache)
+        for footprint, range_px, placement_type in signatures:
+            self.feasibility_map(placement_type, footprint)
+            self.coverage_map(range_px)
+        return len(self._feasibility_cache) + len(self._coverage_cache) != map_count
+
+    def save_atlas(self, atlas_path: str, sources: list[str]):
+        """Write every computed map to <atlas_path> as .npy files, tagged with the fingerprint of <sources>."""
+        os.makedirs(atlas_path, exist_ok=True)
+        for name in os.listdir(atlas_path):
+            if name.endswith(".npy") or name == ATLAS_MANIFEST:
+                os.remove(os.path.join(atlas_path, name))
+
+        manifest = {
+            "version": ATLAS_VERSION,
+            "sources": source_fingerprint(sources),
+            "feasibility": {},
+            "coverage": {},
+        }
+        arrays = {
+            "track.npy": self.track,
+            "land.npy": self.land,
+            "water.npy": self.water,
+            "flow_points.npy": self.flow_points,
+        }
+        for (placement_type, footprint), feasible in self._feasibility_cache.items():
+            name = f"feasibility_{placement_type}_{footprint.name}.npy"
+            manifest["feasibility"][name] = [
+                placement_type, footprint.shape, footprint.radius, footprint.width, footprint.height
+            ]
+            arrays[name] = feasible
+        for range_px, coverage in self._coverage_cache.items():
+            name = f"coverage_{range_px}.npy"
+            manifest["coverage"][name] = range_px
+            arrays[name] = coverage
+
+        for name, array in arrays.items():
+            np.save(os.path.join(atlas_path, name), array)
+
+        # Manifest goes last, so a partially written atlas is never considered valid
+        with open(os.path.join(atlas_path, ATLAS_MANIFEST), "w", encoding="utf-8") as f:
+            json.dump(manifest, f, indent=2)
+
+    @classmethod
+    def load_atlas(cls, atlas_path: str, sources: list[str]):
+        """
+        Memory-map a saved atlas. Returns None if there is no atlas, it has an old version,
+        or any of the <sources> changed since it was written.
+        """
+        try:
+            with open(os.path.join(atlas_path, ATLAS_MANIFEST), "r", encoding="utf-8") as f:
+                manifest = json.load(f)
+        except (FileNotFoundError, json.JSONDecodeError):
+            return None
+
+        if manifest.get("version") != ATLAS_VERSION or manifest.get("sources") != source_fingerprint(sources):
+            return None
+
+        def load(name: str) -> np.ndarray:
+            return np.load(os.path.join(atlas_path, name), mmap_mode="r")
+
+        try:
+            engine = cls(load("track.npy"), load("land.npy"), load("water.npy"), load("flow_points.npy"))
+            for name, (placement_type, *footprint) in manifest["feasibility"].items():
+                engine._feasibility_cache[(placement_type, Footprint(*footprint))] = load(name)
+            for name, range_px in manifest["coverage"].items():
+                engine._coverage_cache[range_px] = load(name)
+        except (FileNotFoundError, ValueError):
+            return None
+        return engine
+
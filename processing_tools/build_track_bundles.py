@@ -0,0 +1,20 @@
+import os
+
+from track_bundle import build_track_bundle, TrackBundle, track_sources
+
+# --- Config ---
+tracks_root_path = "../data/tracks/"
+
+# --- Compile every track folder that has all of its source files ---
+for track_name in sorted(os.listdir(tracks_root_path)):
+    track_folder_path = os.path.join(tracks_root_path, track_name)
+    if not os.path.isdir(track_folder_path):
+        continue
+    missing = [path for path in track_sources(track_folder_path) if not os.path.exists(path)]
+    if missing:
+        print(f"Skipping {track_name}, missing: {', '.join(os.path.basename(path) for path in missing)}")
+        continue
+
+    bundle = TrackBundle.open(build_track_bundle(track_folder_path))
+    size_kb = os.path.getsize(bundle.path) / 1024
+    print(f"Built {bundle.path} ({bundle.width}x{bundle.height}, {len(bundle.flow_points)} flow points, {size_kb:.0f} KB)")
@@ -0,0 +1,24 @@
+import os
+
+from bloons import BloonsBrain
+from data.enums import BloonsDifficulty
+from upgrade_orders import solve_upgrade_orders, save_upgrade_orders, UPGRADE_ORDERS_PATH, UPGRADE_ORDER_HORIZON
+
+# --- Config ---
+# Game data paths are relative to the repository root
+os.chdir(os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+horizon = UPGRADE_ORDER_HORIZON
+
+# --- Solve every tower's upgrade order from the brain's compiled crosspath stats ---
+brain = BloonsBrain.for_game_data()
+orders = solve_upgrade_orders(brain.crosspath_stats, horizon)
+save_upgrade_orders(orders, UPGRADE_ORDERS_PATH)
+
+difficulty = BloonsDifficulty.MEDIUM.name
+for tower, solved in orders["towers"].items():
+    sequence = solved[difficulty]["sequence"]
+    tiers = dict.fromkeys(("top", "middle", "bottom"), 0)
+    for path in sequence:
+        tiers[path] += 1
+    print(f"{tower}: {'-'.join(str(tier) for tier in tiers.values())} via {', '.join(sequence) or 'no upgrades'}")
+print(f"Saved {len(orders['towers'])} towers to {UPGRADE_ORDERS_PATH}")
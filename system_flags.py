@@ -3,10 +3,22 @@ SUPPRESS_SCREEN_MATCHING_OUTPUT = True
 SUPPRESS_FOCUS_OUTPUT = True
 SUPPRESS_PLACEMENT_LOCATION_OUTPUT = True
 
+# Debug: compare the brain's running DPS/coverage totals with a full recomputation after every change
+CHECK_TOWER_AGGREGATES = False
+
 UPGRADE_DELAY = 0.5
 
 PIXELS_PER_BLOONS_UNIT = 5.375
 
+TRACK_CACHE_MAX_BYTES = 512 * 1024 * 1024
+
+# Screen probes closer than this many pixels are captured as one box (0 = every pixel alone, inf = one union box)
+PROBE_BOX_GAP = 48
+
+# Shared window frames: how many recent frames are kept, and how old a frame consumers accept by default
+FRAME_BUFFER_SIZE = 4
+FRAME_MAX_AGE_MS = 100
+
 
 def vprint(*args, **kwargs):
     if VERBOSE:
@@ -135,10 +135,14 @@ def main():
     # Check each track position and test the navigation.
     brain = BloonsBrain()
     brain.set_gamemode(BloonsGamemode.EASY_STANDARD)
-    for track in Track:
+    tracks = list(Track)
+    for i, track in enumerate(tracks):
         print("Navigating to", track.value)
         brain.navigate_to(BloonsScreen.MAP_SELECT)
         brain.select_track(track)
+        # Load the next track's data while this one is being navigated to
+        if i + 1 < len(tracks):
+            brain.prefetch_track(tracks[i + 1])
         brain.navigate_to(BloonsScreen.IN_GAME)
         time.sleep(1)
 
@@ -0,0 +1,25 @@
+import os
+import sys
+
+import numpy as np
+import pytest
+
+# Modules live at the repository root
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+from data.enums import PAGE_IDENTIFIER_POINTS
+
+
+@pytest.fixture
+def screen_image():
+    """
+    Builds an (h, w, 3) RGB window image of a screen: black, except for the identifier points of one of the screen's
+    match sets painted in their expected colors.
+    """
+    def paint(screen, width: int = 960, height: int = 540, match_set: int = 0) -> np.ndarray:
+        image = np.zeros((height, width, 3), dtype=np.uint8)
+        for (w_fraction, h_fraction), color in PAGE_IDENTIFIER_POINTS[screen][match_set]:
+            image[int(height * h_fraction), int(width * w_fraction)] = color
+        return image
+
+    return paint
@@ -0,0 +1,89 @@
+import os
+import random
+import time
+
+import pytest
+
+# The brain imports the window, input and OCR modules
+for module in ("pyautogui", "pydirectinput", "pygetwindow", "easyocr", "PIL", "torch"):
+    pytest.importorskip(module)
+
+import bloons
+from bloons import BloonsBrain
+from data.enums import BloonsGamemode, BloonsScreen, Hero, Tower, Track
+
+ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..")
+
+
+class FakeMoneyReader:
+    def __init__(self):
+        self.money = 0
+
+    def get_money(self) -> tuple[int, float]:
+        return self.money, time.time()
+
+
+class FakeController:
+    def __init__(self):
+        self.clicks = []
+
+    def click(self, x: float, y: float):
+        self.clicks.append((x, y))
+
+    def press_key(self, key):
+        pass
+
+    def move(self, x: float, y: float):
+        pass
+
+
+@pytest.fixture
+def brain(monkeypatch):
+    monkeypatch.chdir(ROOT)
+    monkeypatch.setattr(bloons, "identify_screen_fast", lambda *args, **kwargs: BloonsScreen.IN_GAME)
+    monkeypatch.setattr(bloons.time, "sleep", lambda seconds: None)
+    brain = BloonsBrain.for_game_data()
+    brain.money_reader = FakeMoneyReader()
+    brain.controller = FakeController()
+    brain.window_manager = None
+    brain.frames = None
+    return brain
+
+
+@pytest.mark.parametrize("track", [Track.MONKEY_MEADOW, Track.ALPINE_RUN])
+def test_memoized_actions_match_a_fresh_search(brain, track):
+    brain.select_track(track)
+    brain.set_gamemode(BloonsGamemode.MEDIUM_STANDARD)
+    brain.select_hero(list(Hero)[0])
+    rng = random.Random(0)
+    towers = rng.sample([tower for tower in Tower if tower.value in brain.tower_data], 10)
+
+    placements = 0
+    for _ in range(80):
+        brain.money_reader.money = rng.choice([300, 1500, 4000, 20000])
+        allow_placement = rng.random() < 0.6
+        action = brain.find_best_action(towers, allow_placement)
+        memo_placements = dict(brain._memo_placements)
+        brain._reset_action_memo()
+        assert brain.find_best_action(towers, allow_placement) == action
+        fresh_placements = brain._memo_placements
+        assert all(fresh_placements[tower] == placement
+                   for tower, placement in memo_placements.items() if tower in fresh_placements)
+        if action is None:
+            continue
+
+        kind, subject, target, _ = action
+        if kind == "upgrade":
+            brain.upgrade_tower(subject, target)
+            continue
+        # Placements are tracked at the exact pixel the search found, and clicked at its window position
+        assert target == brain.find_best_placement(subject)
+        if kind == "place":
+            brain.place_tower(subject, target)
+        else:
+            brain.place_hero(target)
+        placements += 1
+        assert brain.occupancy._placed[-1][0] == target
+        h, w = brain.land_mask.shape
+        assert brain.controller.clicks[-1] == (target[0] / w, target[1] / h)
+    assert placements > 5
@@ -0,0 +1,69 @@
+import numpy as np
+import pytest
+
+from data.enums import PathProfile
+from flow_points import FlowPointIndex
+
+CELL_SIZE = 16
+
+
+def edge_points(seed: int) -> np.ndarray:
+    """A wandering path, plus points on, just inside and just outside cell edges (some at negative coordinates)."""
+    rng = np.random.default_rng(seed)
+    path = np.cumsum(rng.normal(0, 4, size=(300, 2)), axis=0) + (40, 40)
+    edges = rng.integers(-2, 8, size=(120, 2)) * CELL_SIZE + rng.choice([0, 1e-9, -1e-9, 0.5, -0.5], size=(120, 2))
+    return np.concatenate([path, edges])
+
+
+def brute_force_within(points: np.ndarray, x: float, y: float, radius: float) -> np.ndarray:
+    return np.flatnonzero((points[:, 0] - x) ** 2 + (points[:, 1] - y) ** 2 < radius ** 2)
+
+
+@pytest.mark.parametrize("seed", range(3))
+@pytest.mark.parametrize("radius", [0, 0.5, 7, CELL_SIZE, CELL_SIZE + 1e-9, 45.5, 400])
+def test_queries_match_brute_force(seed, radius):
+    points = edge_points(seed)
+    index = FlowPointIndex(points, cell_size=CELL_SIZE)
+    rng = np.random.default_rng(seed + 100)
+    # Centres on cell corners and edges, near points, and off the grid entirely
+    centres = np.concatenate([
+        rng.integers(-3, 9, size=(20, 2)) * CELL_SIZE,
+        points[rng.integers(len(points), size=20)] + rng.choice([0, radius, -radius], size=(20, 2)),
+        rng.uniform(-200, 300, size=(20, 2)),
+    ])
+
+    counts = index.count_within_many(centres, radius)
+    for (x, y), count in zip(centres, counts):
+        expected = brute_force_within(points, x, y, radius)
+        assert np.array_equal(index.query_radius(x, y, radius), expected)
+        assert index.count_within(x, y, radius) == count == len(expected)
+
+
+def direct_weights(points: np.ndarray, profile: PathProfile) -> np.ndarray:
+    """Each point's weight, summed directly: half the path to each neighbour, shaped by the profile, scaled to n."""
+    segments = np.hypot(*np.diff(points, axis=0).T)
+    weights = np.zeros(len(points))
+    for i in range(len(points)):
+        share = (segments[i - 1] if i > 0 else 0) / 2 + (segments[i] if i < len(segments) else 0) / 2
+        fraction = segments[:i].sum() / segments.sum()
+        if profile == PathProfile.EARLY:
+            share *= 2 * (1 - fraction)
+        elif profile == PathProfile.LATE:
+            share *= 2 * fraction
+        weights[i] = share
+    return weights * len(points) / weights.sum()
+
+
+@pytest.mark.parametrize("seed", range(3))
+@pytest.mark.parametrize("profile", list(PathProfile))
+def test_prefix_weights_match_direct_sums(seed, profile):
+    # Unevenly spaced points, so every point's share of the path differs
+    rng = np.random.default_rng(seed)
+    points = np.cumsum(rng.uniform(0.5, 12, size=(200, 1)) * rng.normal(size=(200, 2)), axis=0)
+    index = FlowPointIndex(points, cell_size=CELL_SIZE)
+    weights = direct_weights(points, profile)
+
+    for x, y in points[rng.integers(len(points), size=25)]:
+        for radius in (3, 20, 80, 10_000):
+            covered = brute_force_within(points, x, y, radius)
+            assert index.weighted_within(x, y, radius, profile) == pytest.approx(weights[covered].sum(), abs=1e-9)
@@ -0,0 +1,90 @@
+import time
+
+import pytest
+
+# Frames are grabbed through the window, input and OCR modules
+for module in ("pyautogui", "pydirectinput", "pygetwindow", "easyocr", "PIL", "torch"):
+    pytest.importorskip(module)
+
+import frame_service
+import interaction
+from data.enums import BloonsScreen
+from frame_service import FrameService
+from interaction import WindowManager
+from vision import identify_screen, identify_screen_fast, screen_identifier_pixels
+
+LEFT, TOP = 100, 50
+
+
+class FakeWindowManager(WindowManager):
+    """A window showing a fixed image, that records every capture made from it ("full" or "probe")."""
+
+    def __init__(self, image):
+        super().__init__("fake window")
+        self.image = image
+        self.grabs = []
+
+    def focus_window(self):
+        return True
+
+    def get_window_geometry(self):
+        return LEFT, TOP, self.image.shape[1], self.image.shape[0]
+
+    def capture_pixels(self, xs, ys, force_focus=False, **kwargs):
+        self.grabs.append("probe")
+        return super().capture_pixels(xs, ys, force_focus, **kwargs)
+
+    def grab_region(self, left: int, top: int, width: int, height: int):
+        if (width, height) == (self.image.shape[1], self.image.shape[0]):
+            self.grabs.append("full")
+        return self.image[top - TOP:top - TOP + height, left - LEFT:left - LEFT + width].copy()
+
+
+@pytest.fixture
+def window(monkeypatch, screen_image):
+    monkeypatch.setattr(WindowManager, "find_window_by_title", staticmethod(lambda title: None))
+    window = FakeWindowManager(screen_image(BloonsScreen.IN_GAME))
+    monkeypatch.setattr(frame_service, "grab_region", window.grab_region)
+    monkeypatch.setattr(interaction, "grab_region", window.grab_region)
+    return window
+
+
+def test_screen_checks_in_one_tick_share_a_probe_capture(window):
+    frames = FrameService(window)
+    # The main loop's screen check, then place_tower's before clicking
+    assert identify_screen_fast(frames, force_focus=True) == BloonsScreen.IN_GAME
+    first, pixels = frames.get_pixels(screen_identifier_pixels)
+    assert identify_screen_fast(frames) == BloonsScreen.IN_GAME
+    second, _ = frames.get_pixels(screen_identifier_pixels)
+    assert second is first and first.image is None
+    assert window.grabs == ["probe"]
+
+    # Probing reads the same pixels a full frame would
+    xs, ys = screen_identifier_pixels(window.image.shape[1], window.image.shape[0])
+    assert (pixels == window.image[ys, xs]).all()
+
+    # A probe capture can't serve consumers that need the whole frame
+    full = frames.get_frame()
+    assert full.image is not None
+    assert window.grabs == ["probe", "full"]
+
+
+def test_screen_checks_reuse_the_money_readers_frame(window):
+    frames = FrameService(window)
+    # The money reader's grab, then screen checks in the same tick
+    full = frames.get_frame()
+    assert identify_screen_fast(frames, force_focus=True) == identify_screen(full.image) == BloonsScreen.IN_GAME
+    assert frames.get_pixels(screen_identifier_pixels)[0] is full
+    assert frames.latest() is full
+    assert window.grabs == ["full"]
+
+
+def test_stale_frames_are_not_reused(window):
+    frames = FrameService(window)
+    identify_screen_fast(frames)
+    time.sleep(0.02)
+    # A check that must see the screen after a click (see BloonsBrain.wait_for_screen)
+    identify_screen_fast(frames, max_age_ms=10)
+    assert window.grabs == ["probe", "probe"]
+    frames.next_frame(time.time())
+    assert window.grabs == ["probe", "probe", "full"]
@@ -0,0 +1,207 @@
+import os
+
+import cv2
+import numpy as np
+import pytest
+
+from flow_points import FlowPointIndex
+from placement import PlacementEngine, OccupancyIndex, Footprint
+from track_bundle import TrackBundle
+
+TRACKS_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "data", "tracks")
+
+FOOTPRINTS = [
+    Footprint("circular", radius=6),
+    Footprint("circular", radius=11),
+    Footprint("rectangular", width=15, height=9),
+]
+
+
+def synthetic_engine(seed: int, height: int = 120, width: int = 173) -> PlacementEngine:
+    """Blobby land/water terrain and a wandering track, on a size that doesn't divide into blocks evenly."""
+    rng = np.random.default_rng(seed)
+    yy, xx = np.mgrid[:height, :width]
+    terrain = np.sin(xx / rng.uniform(6, 15)) + np.cos(yy / rng.uniform(6, 15)) + rng.normal(0, 0.3, (height, width))
+    water = terrain > 1.2
+    land = ~water & (terrain > -1.5)
+
+    flow_points = []
+    x, y = 0.0, rng.uniform(0, height)
+    while x < width:
+        flow_points.append((x, y))
+        x += rng.uniform(1, 4)
+        y = float(np.clip(y + rng.normal(0, 4), 0, height - 1))
+    flow_points = np.array(flow_points, dtype=np.float32)
+    track = np.zeros((height, width), dtype=bool)
+    for px, py in flow_points.astype(int):
+        track[max(py - 2, 0):py + 3, max(px - 2, 0):px + 3] = True
+    return PlacementEngine(track, land, water, flow_points)
+
+
+def assert_pyramid_matches(engine, placement_type, footprint, range_px, occupancy, **pyramid_args):
+    expected = engine.best_placement(placement_type, footprint, range_px, occupancy)
+    assert engine.best_placement_pyramid(placement_type, footprint, range_px, occupancy, **pyramid_args) == expected
+    return expected
+
+
+def play(engine, placement_type, footprint, range_px, steps, **pyramid_args):
+    """Check the pyramid search while placing a tower at the best spot after every query."""
+    occupancy = OccupancyIndex(engine.height, engine.width)
+    for _ in range(steps):
+        best = assert_pyramid_matches(engine, placement_type, footprint, range_px, occupancy, **pyramid_args)
+        if best is None:
+            break
+        occupancy.add(best[0], footprint)
+
+
+@pytest.mark.parametrize("seed", range(4))
+@pytest.mark.parametrize("placement_type", ["land", "water", "any"])
+@pytest.mark.parametrize("footprint", FOOTPRINTS, ids=lambda footprint: footprint.name)
+def test_pyramid_matches_exhaustive_search(seed, placement_type, footprint):
+    engine = synthetic_engine(seed)
+    for range_px, block_size, top_k in ((9, 16, 16), (25, 8, 3), (60, 32, 1)):
+        play(engine, placement_type, footprint, range_px, steps=8, block_size=block_size, top_k=top_k)
+
+
+def test_pyramid_breaks_ties_in_row_major_order():
+    # A range wider than the screen covers every flow point from every pixel, so all placeable pixels tie
+    engine = synthetic_engine(seed=7)
+    footprint = Footprint("circular", radius=4)
+    range_px = engine.height + engine.width
+    occupancy = OccupancyIndex(engine.height, engine.width)
+    for _ in range(6):
+        best = assert_pyramid_matches(engine, "land", footprint, range_px, occupancy, block_size=16, top_k=2)
+        ys, xs = np.nonzero(engine.placeable_map("land", footprint, occupancy))
+        assert best == ((int(xs[0]), int(ys[0])), len(engine.flow_points))
+        occupancy.add(best[0], footprint)
+
+
+def test_pyramid_on_empty_map():
+    engine = synthetic_engine(seed=1)
+    footprint = Footprint("circular", radius=max(engine.height, engine.width))
+    assert engine.best_placement_pyramid("land", footprint, 20) is None
+    assert engine.best_placement("land", footprint, 20) is None
+
+
+def real_track_engine(track: str) -> PlacementEngine:
+    bundle = TrackBundle.load(os.path.join(TRACKS_PATH, track))
+    return PlacementEngine(
+        bundle.track_mask.unpack(), bundle.land_mask.unpack(), bundle.water_mask.unpack(), bundle.flow_points
+    )
+
+
+def test_pyramid_matches_exhaustive_search_on_real_track():
+    engine = real_track_engine("monkey_meadow")
+    for placement_type, footprint, range_px in (
+            ("land", Footprint("circular", radius=37), 172),
+            ("land", Footprint("rectangular", width=150, height=96), 430),
+            ("water", Footprint("circular", radius=48), 215),
+    ):
+        play(engine, placement_type, footprint, range_px, steps=12)
+
+
+def test_free_maps_and_placeable_counts_follow_added_towers():
+    # Reference: erode the whole free space with each footprint's kernel after every tower
+    engine = synthetic_engine(seed=3)
+    rng = np.random.default_rng(3)
+    occupancy = OccupancyIndex(engine.height, engine.width)
+    for footprint in FOOTPRINTS:
+        occupancy.placeable_count("land", footprint, engine.feasibility_map("land", footprint))
+
+    for _ in range(15):
+        footprint = FOOTPRINTS[rng.integers(len(FOOTPRINTS))]
+        occupancy.add((int(rng.integers(-5, engine.width + 5)), int(rng.integers(-5, engine.height + 5))), footprint)
+        free_space = (~occupancy.occupied.unpack()).astype(np.uint8)
+        for free_footprint in FOOTPRINTS:
+            expected = cv2.erode(free_space, free_footprint.kernel(), borderType=cv2.BORDER_CONSTANT, borderValue=1) > 0
+            assert np.array_equal(occupancy.free_map(free_footprint), expected)
+            feasible = engine.feasibility_map("land", free_footprint)
+            assert occupancy.placeable_count("land", free_footprint) == np.count_nonzero(feasible & expected)
+
+
+def test_free_blocks_match_free_map():
+    engine = synthetic_engine(seed=5)
+    rng = np.random.default_rng(5)
+    occupancy = OccupancyIndex(engine.height, engine.width)
+    for _ in range(12):
+        occupancy.add((int(rng.integers(-5, engine.width + 5)), int(rng.integers(-5, engine.height + 5))),
+                      FOOTPRINTS[rng.integers(len(FOOTPRINTS))])
+
+    size = 16
+    # Windows that reach past the bottom and right edges, where pixels off screen count as free
+    y0s = rng.integers(0, engine.height, size=40)
+    x0s = rng.integers(0, engine.width, size=40)
+    for footprint in FOOTPRINTS:
+        padded = np.ones((engine.height + size, engine.width + size), dtype=bool)
+        padded[:engine.height, :engine.width] = occupancy.free_map(footprint)
+        free = occupancy.free_blocks(footprint, y0s, x0s, size)
+        for i, (y0, x0) in enumerate(zip(y0s, x0s)):
+            assert np.array_equal(free[i], padded[y0:y0 + size, x0:x0 + size])
+
+
+@pytest.mark.parametrize("track", ["monkey_meadow", "alpine_run", "in_the_loop"])
+def test_pyramid_cost_does_not_grow_with_placed_towers(track, monkeypatch):
+    # With 40 towers on screen, searches never build a full free map and only refine the blocks that can hold
+    # the best pixel or that the last tower reached
+    engine = real_track_engine(track)
+    signatures = [
+        ("land", Footprint("circular", radius=37), 172),
+        ("land", Footprint("rectangular", width=150, height=96), 430),
+        ("land", Footprint("circular", radius=25), 300),
+    ]
+    block_size = 16
+    block_count = -(-engine.height // block_size) * -(-engine.width // block_size)
+    refined = []
+    refine_blocks = engine._refine_blocks
+
+    def counting_refine_blocks(blocks, *args, **kwargs):
+        refined[-1] += len(blocks)
+        return refine_blocks(blocks, *args, **kwargs)
+
+    def no_free_map(self, footprint):
+        raise AssertionError("The pyramid search built a full free map.")
+
+    monkeypatch.setattr(engine, "_refine_blocks", counting_refine_blocks)
+    occupancy = OccupancyIndex(engine.height, engine.width)
+    for step in range(40):
+        expected = {signature: engine.best_placement(*signature, occupancy) for signature in signatures}
+        with monkeypatch.context() as patch:
+            patch.setattr(OccupancyIndex, "free_map", no_free_map)
+            for signature in signatures:
+                refined.append(0)
+                assert engine.best_placement_pyramid(*signature, occupancy, block_size=block_size) \
+                       == expected[signature]
+                assert refined[-1] < 0.03 * block_count
+            batched = engine.best_placements(
+                [(footprint, range_px, placement_type) for placement_type, footprint, range_px in signatures], occupancy
+            )
+        assert batched == {(footprint, range_px, placement_type): expected[(placement_type, footprint, range_px)]
+                           for placement_type, footprint, range_px in signatures}
+
+        signature = signatures[step % len(signatures)]
+        occupancy.add(expected[signature][0], signature[1])
+
+
+@pytest.mark.parametrize("seed", range(3))
+@pytest.mark.parametrize("range_px", [3, 10, 27, 64])
+def test_coverage_map_matches_exact_counts_within_rounding(seed, range_px):
+    engine = synthetic_engine(seed)
+    ys, xs = np.mgrid[:engine.height, :engine.width]
+    pixels = np.column_stack([xs.ravel(), ys.ravel()])
+    exact = FlowPointIndex(engine.flow_points).count_within_many(pixels, range_px)
+    coverage = engine.coverage_map(range_px).ravel().astype(np.int64)
+
+    # A point can only be counted differently if its exact distance is within its rounding shift of the range
+    points = engine.flow_points.astype(np.float64)
+    raster = np.column_stack([
+        np.clip(np.rint(points[:, 0]), 0, engine.width - 1), np.clip(np.rint(points[:, 1]), 0, engine.height - 1)
+    ])
+    shifts = np.hypot(*(points - raster).T)
+    distances = np.hypot(pixels[:, None, 0] - points[:, 0], pixels[:, None, 1] - points[:, 1])
+    ambiguous = (np.abs(distances - range_px) <= shifts).sum(axis=1)
+    assert (np.abs(coverage - exact) <= ambiguous).all()
+
+    # On-screen points move at most half a pixel diagonal, and counts are off by a fraction of a point on average
+    on_screen = (points >= 0).all(axis=1) & (points[:, 0] <= engine.width - 1) & (points[:, 1] <= engine.height - 1)
+    assert (shifts[on_screen] <= np.sqrt(0.5) + 1e-9).all()
+    assert np.abs(coverage - exact).mean() < 0.2
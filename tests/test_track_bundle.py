@@ -0,0 +1,122 @@
+import json
+import os
+import shutil
+
+import cv2
+import numpy as np
+import pytest
+
+import track_bundle
+from placement import PlacementEngine
+from track_bundle import TRACK_JSON, TRACK_MASKS, TrackBundle, build_track_bundle, track_sources
+
+ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..")
+SOURCE_TRACK = os.path.join(ROOT, "data", "tracks", "monkey_meadow")
+
+
+@pytest.fixture
+def track_folder(tmp_path):
+    """A copy of a track's source files, without its bundle or atlas."""
+    for path in track_sources(SOURCE_TRACK):
+        shutil.copy2(path, tmp_path)
+    return str(tmp_path)
+
+
+def source_mask(folder: str, key: str) -> np.ndarray:
+    """A mask read straight from its image, thresholded as the bot always has."""
+    channel = cv2.imread(os.path.join(folder, TRACK_MASKS[key]))[:, :, 0]
+    return channel > 128 if key == "track_mask" else channel >= 128
+
+
+def touch(path: str):
+    """Move a file's modification time forward, as editing it would."""
+    stat = os.stat(path)
+    os.utime(path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 10 ** 9))
+
+
+def test_round_trip_matches_sources(track_folder):
+    build_track_bundle(track_folder)
+    bundle = TrackBundle.load(track_folder)
+    assert all(isinstance(section, np.memmap) for section in bundle.sections.values())
+
+    for key in TRACK_MASKS:
+        expected = source_mask(track_folder, key)
+        assert bundle.mask(key).shape == expected.shape == (bundle.height, bundle.width)
+        assert np.array_equal(bundle.mask(key).unpack(), expected)
+
+    with open(os.path.join(track_folder, TRACK_JSON), "r", encoding="utf-8") as f:
+        metadata = json.load(f)
+    expected_points = np.asarray(metadata.pop("flow_points"), dtype=np.float32)
+    assert bundle.flow_points.dtype == np.float32
+    assert np.array_equal(bundle.flow_points, expected_points)
+    assert bundle.metadata == metadata
+
+    # Copies in memory are the same as the mapped sections
+    mapped = {key: np.array(section) for key, section in bundle.sections.items()}
+    bundle.load_into_memory()
+    assert all(np.array_equal(bundle.sections[key], mapped[key]) for key in mapped)
+
+
+def test_edited_source_rebuilds_bundle(track_folder):
+    bundle = TrackBundle.load(track_folder)
+    assert bundle.land_mask.any()
+    del bundle
+
+    # Clearing the land mask must show up in the next load, not the stale bundle
+    land_path = os.path.join(track_folder, TRACK_MASKS["land_mask"])
+    image = cv2.imread(land_path)
+    cv2.imwrite(land_path, np.zeros_like(image))
+    touch(land_path)
+    bundle = TrackBundle.load(track_folder)
+    assert not bundle.land_mask.any()
+    assert bundle.sources == track_bundle.source_fingerprint(track_sources(track_folder))
+
+
+def test_current_bundle_is_not_rebuilt(track_folder):
+    bundle_path = build_track_bundle(track_folder)
+    built = os.stat(bundle_path).st_mtime_ns
+    touch(bundle_path)
+    TrackBundle.load(track_folder)
+    assert os.stat(bundle_path).st_mtime_ns == built + 10 ** 9
+
+
+def test_old_version_rebuilds_bundle(track_folder, monkeypatch):
+    build_track_bundle(track_folder)
+    monkeypatch.setattr(track_bundle, "BUNDLE_VERSION", track_bundle.BUNDLE_VERSION + 1)
+    assert TrackBundle.load(track_folder).version == track_bundle.BUNDLE_VERSION
+
+
+def test_truncated_bundle_rebuilds(track_folder):
+    bundle_path = build_track_bundle(track_folder)
+    with open(bundle_path, "r+b") as f:
+        f.truncate(20)
+    bundle = TrackBundle.load(track_folder)
+    assert np.array_equal(bundle.track_mask.unpack(), source_mask(track_folder, "track_mask"))
+
+
+def test_bundle_without_sources_fails_when_unreadable(track_folder):
+    bundle_path = build_track_bundle(track_folder)
+    with open(bundle_path, "r+b") as f:
+        f.write(b"garbage!")
+    os.remove(os.path.join(track_folder, TRACK_JSON))
+    with pytest.raises(RuntimeError):
+        TrackBundle.load(track_folder)
+
+
+def test_atlas_is_stale_once_bundle_is_rebuilt(track_folder):
+    bundle = TrackBundle.load(track_folder)
+    atlas_path = os.path.join(track_folder, "placement_atlas")
+    engine = PlacementEngine(
+        bundle.track_mask.unpack(), bundle.land_mask.unpack(), bundle.water_mask.unpack(), bundle.flow_points
+    )
+    engine.save_atlas(atlas_path, [bundle.path])
+
+    loaded = PlacementEngine.load_atlas(atlas_path, [bundle.path])
+    assert loaded is not None
+    assert np.array_equal(loaded.land, engine.land)
+    assert np.array_equal(loaded.flow_points, engine.flow_points)
+    del bundle, loaded
+
+    touch(os.path.join(track_folder, TRACK_MASKS["water_mask"]))
+    bundle = TrackBundle.load(track_folder)
+    assert PlacementEngine.load_atlas(atlas_path, [bundle.path]) is None
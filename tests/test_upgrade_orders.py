@@ -0,0 +1,101 @@
+import json
+import math
+import os
+
+import numpy as np
+import pytest
+
+from crosspaths import CROSSPATHS, NEXT_COLUMNS, UPGRADE_PATHS, crosspath_column
+from fingerprint import content_fingerprint
+from upgrade_orders import UPGRADE_ORDER_SOURCES, UPGRADE_ORDERS_PATH, UpgradeOrders, solve_upgrade_order
+
+ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..")
+HORIZON = 500.0
+
+
+def hand_built_tower(seed: int) -> tuple[np.ndarray, np.ndarray]:
+    """DPS and cumulative cost in every crosspath state of a made-up tower, with crosspath synergies."""
+    rng = np.random.default_rng(seed)
+    tier_costs = rng.integers(50, 800, size=(len(UPGRADE_PATHS), 6))
+    tier_gains = rng.uniform(-2, 10, size=(len(UPGRADE_PATHS), 6))
+    dps = np.zeros(len(CROSSPATHS))
+    cost = np.zeros(len(CROSSPATHS))
+    for column, tiers in enumerate(CROSSPATHS):
+        cost[column] = 200 + sum(tier_costs[p, 1:tier + 1].sum() for p, tier in enumerate(tiers))
+        dps[column] = 5 + sum(tier_gains[p, 1:tier + 1].sum() for p, tier in enumerate(tiers))
+    dps += rng.uniform(0, 3, size=len(CROSSPATHS)) * (np.count_nonzero(CROSSPATHS, axis=1) > 1)
+    return dps, cost
+
+
+def enumerate_orders(column: int) -> list[list[int]]:
+    """Every sequence of upgrade paths that can be bought from a crosspath state (including buying nothing)."""
+    orders = [[]]
+    for p, next_column in enumerate(NEXT_COLUMNS[column]):
+        if next_column >= 0:
+            orders += [[p] + order for order in enumerate_orders(next_column)]
+    return orders
+
+
+def order_value(dps: np.ndarray, cost: np.ndarray, column: int, order: list[int], horizon: float) -> float:
+    """Discounted DPS gained by buying <order> from <column>, summed step by step."""
+    value = 0.0
+    spent = 0.0
+    for p in order:
+        next_column = NEXT_COLUMNS[column, p]
+        spent += cost[next_column] - cost[column]
+        value += math.exp(-spent / horizon) * (dps[next_column] - dps[column])
+        column = next_column
+    return value
+
+
+@pytest.mark.parametrize("seed", range(3))
+def test_solver_matches_brute_force_enumeration(seed):
+    dps, cost = hand_built_tower(seed)
+    values, _, best = solve_upgrade_order(dps, cost, HORIZON)
+
+    for column in range(len(CROSSPATHS)):
+        orders = enumerate_orders(column)
+        order_values = [order_value(dps, cost, column, order, HORIZON) for order in orders]
+        assert values[column] == pytest.approx(max(order_values), rel=1e-9, abs=1e-12)
+
+    # Following the solver's best steps from an unupgraded tower buys the best order
+    column = crosspath_column(dict.fromkeys(UPGRADE_PATHS, 0))
+    root = column
+    sequence = []
+    while best[column] >= 0:
+        sequence.append(int(best[column]))
+        column = NEXT_COLUMNS[column, best[column]]
+    orders = enumerate_orders(root)
+    best_order = max(orders, key=lambda order: order_value(dps, cost, root, order, HORIZON))
+    assert sequence == best_order
+
+
+def test_committed_table_matches_sources(monkeypatch):
+    monkeypatch.chdir(ROOT)
+    assert UpgradeOrders.load() is not None
+
+
+def test_fingerprint_ignores_line_endings(tmp_path):
+    copies = []
+    for path in UPGRADE_ORDER_SOURCES:
+        with open(os.path.join(ROOT, path), "rb") as f:
+            data = f.read()
+        copy = tmp_path / os.path.basename(path)
+        copy.write_bytes(data.replace(b"\r\n", b"\n").replace(b"\n", b"\r\n"))
+        copies.append(str(copy))
+    assert content_fingerprint(copies) == content_fingerprint([os.path.join(ROOT, p) for p in UPGRADE_ORDER_SOURCES])
+
+
+def test_regenerating_reproduces_committed_table(monkeypatch):
+    # Compiling the crosspath stats goes through the brain, which needs the game window dependencies
+    for module in ("pyautogui", "pydirectinput", "pygetwindow", "easyocr", "PIL", "torch"):
+        pytest.importorskip(module)
+    from bloons import BloonsBrain
+    from upgrade_orders import solve_upgrade_orders
+
+    monkeypatch.chdir(ROOT)
+    with open(UPGRADE_ORDERS_PATH, "r", encoding="utf-8") as f:
+        committed = json.load(f)
+    brain = BloonsBrain.for_game_data()
+    regenerated = json.loads(json.dumps(solve_upgrade_orders(brain.crosspath_stats, committed["horizon"])))
+    assert regenerated == committed
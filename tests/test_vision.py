@@ -0,0 +1,116 @@
+import glob
+import os
+
+import cv2
+import numpy as np
+import pytest
+
+# The classifier lives next to the OCR and window capture code
+for module in ("pyautogui", "pydirectinput", "pygetwindow", "easyocr", "PIL", "torch"):
+    pytest.importorskip(module)
+
+import interaction
+from data.enums import PAGE_IDENTIFIER_POINTS
+from frame_service import FrameService
+from interaction import WindowManager, probe_boxes
+from vision import (
+    color_close, compile_screen_signatures, identify_screen, identify_screen_fast, screen_identifier_pixels
+)
+
+ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..")
+SIZES = [(960, 540), (1366, 768), (1920, 1080)]
+PAINTED_SCREENS = [
+    (screen, match_set) for screen, match_sets in PAGE_IDENTIFIER_POINTS.items() for match_set in range(len(match_sets))
+]
+
+
+def reference_identify(image: np.ndarray):
+    """identify_screen as a plain loop over every screen, match set and point."""
+    height, width = image.shape[:2]
+    for screen, match_sets in PAGE_IDENTIFIER_POINTS.items():
+        for match_set in match_sets:
+            if all(color_close(image[int(height * h_frac), int(width * w_frac)].astype(int), color)
+                   for (w_frac, h_frac), color in match_set):
+                return screen
+    return None
+
+
+def stored_screenshots() -> list[np.ndarray]:
+    paths = sorted(glob.glob(os.path.join(ROOT, "data", "tracks", "*", "screenshot.png")))
+    return [cv2.cvtColor(cv2.imread(path), cv2.COLOR_BGR2RGB) for path in paths]
+
+
+class FakeWindowManager(WindowManager):
+    """A window showing a fixed image."""
+
+    def __init__(self, image):
+        self.window_title = "fake window"
+        self.window = None
+        self.image = image
+
+    def focus_window(self):
+        return True
+
+    def get_window_geometry(self):
+        return 0, 0, self.image.shape[1], self.image.shape[0]
+
+    def grab_region(self, left: int, top: int, width: int, height: int):
+        return self.image[top:top + height, left:left + width].copy()
+
+
+@pytest.mark.parametrize("width, height", SIZES)
+@pytest.mark.parametrize("screen, match_set", PAINTED_SCREENS)
+def test_painted_screens_match_reference(screen_image, screen, match_set, width, height):
+    image = screen_image(screen, width, height, match_set)
+    assert reference_identify(image) == screen
+    signatures = compile_screen_signatures(width, height)
+    assert signatures.match(image[signatures.ys, signatures.xs]) == screen
+    assert identify_screen(image) == screen
+
+
+@pytest.mark.parametrize("seed", range(5))
+def test_colors_near_tolerance_match_reference(screen_image, seed):
+    # Jitter every painted identifier just inside or outside the color tolerance
+    rng = np.random.default_rng(seed)
+    for screen, match_set in PAINTED_SCREENS:
+        width, height = SIZES[rng.integers(len(SIZES))]
+        image = screen_image(screen, width, height, match_set).astype(int)
+        points = image.any(axis=2)
+        image[points] += rng.integers(-6, 7, size=(int(points.sum()), 3))
+        image = np.clip(image, 0, 255).astype(np.uint8)
+        assert identify_screen(image) == reference_identify(image)
+
+
+def test_stored_screenshots_match_reference():
+    screenshots = stored_screenshots()
+    if not screenshots:
+        pytest.skip("No stored screenshots.")
+    for image in screenshots:
+        assert identify_screen(image) == reference_identify(image)
+        blank = np.zeros_like(image)
+        assert identify_screen(blank) == reference_identify(blank)
+
+
+@pytest.mark.parametrize("screen, match_set", PAINTED_SCREENS)
+def test_probe_capture_identifies_like_full_frame(monkeypatch, screen_image, screen, match_set):
+    image = screen_image(screen, 1366, 768, match_set)
+    window = FakeWindowManager(image)
+    monkeypatch.setattr(interaction, "grab_region", window.grab_region)
+
+    xs, ys = screen_identifier_pixels(1366, 768)
+    for max_gap in (0, 48, float("inf")):
+        assert np.array_equal(window.capture_pixels(xs, ys, max_gap=max_gap), image[ys, xs])
+    assert identify_screen_fast(FrameService(window)) == identify_screen(image) == screen
+
+
+@pytest.mark.parametrize("width, height", SIZES)
+def test_probe_boxes_cover_every_probe_once(width, height):
+    xs, ys = (tuple(values.tolist()) for values in screen_identifier_pixels(width, height))
+    for max_gap in (0, 48, float("inf")):
+        boxes = probe_boxes(xs, ys, max_gap)
+        indices = np.concatenate([box_indices for _, box_indices in boxes])
+        assert sorted(indices.tolist()) == list(range(len(xs)))
+        for (x0, y0, x1, y1), box_indices in boxes:
+            assert all(x0 <= xs[i] < x1 and y0 <= ys[i] < y1 for i in box_indices)
+    assert len(probe_boxes(xs, ys, 0)) == len(set(zip(xs, ys)))
+    assert len(probe_boxes(xs, ys, float("inf"))) == 1
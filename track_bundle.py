@@ -0,0 +1,181 @@
+import json
+import os
+
+import cv2
+import numpy as np
+
+from fingerprint import source_fingerprint
+from placement import PackedMask
+from system_flags import vprint
+
+BUNDLE_VERSION = 1
+BUNDLE_NAME = "track.bundle"
+BUNDLE_MAGIC = b"BTD6TRK\0"
+BUNDLE_ALIGNMENT = 64
+
+# Mask images in every track folder, by the name they are stored under
+TRACK_MASKS = {
+    "track_mask": "track_mask.png",
+    "land_mask": "land_placement_mask.png",
+    "water_mask": "water_placement_mask.png",
+}
+TRACK_JSON = "path_points.json"
+
+
+def _align(offset: int) -> int:
+    return -(-offset // BUNDLE_ALIGNMENT) * BUNDLE_ALIGNMENT
+
+
+def _read_mask(path: str, track: bool) -> np.ndarray:
+    """Channel 0 of a mask image as a boolean plane (the track is anything above 128, placeable areas 128 and up)."""
+    image = cv2.imread(path)
+    if image is None:
+        raise RuntimeError(f"Could not load mask: '{path}'")
+    channel = image[:, :, 0] if image.ndim == 3 else image
+    return channel > 128 if track else channel >= 128
+
+
+def track_sources(track_folder_path: str) -> list[str]:
+    """Paths of the files a track bundle is compiled from."""
+    return [os.path.join(track_folder_path, name) for name in (*TRACK_MASKS.values(), TRACK_JSON)]
+
+
+def build_track_bundle(track_folder_path: str) -> str:
+    """
+    Compile a track folder's masks and flow points into a single bundle file, and return its path.
+    Layout: magic, uint32 header length, JSON header, then each section aligned to 64 bytes.
+    Section offsets in the header are relative to the first aligned byte after the header.
+    Masks are stored bit-packed along rows, flow points as float32 (x, y) pairs.
+    """
+    with open(os.path.join(track_folder_path, TRACK_JSON), "r", encoding="utf-8") as f:
+        metadata = json.load(f)
+    flow_points = np.asarray(metadata.pop("flow_points", []), dtype=np.float32).reshape(-1, 2)
+    if len(flow_points) == 0:
+        raise RuntimeError(f"No flow points found in '{track_folder_path}'.")
+
+    arrays = {}
+    height = width = None
+    for key, name in TRACK_MASKS.items():
+        mask = _read_mask(os.path.join(track_folder_path, name), track=key == "track_mask")
+        if height is None:
+            height, width = mask.shape
+        elif mask.shape != (height, width):
+            raise RuntimeError(f"Mask '{name}' is {mask.shape}, expected {(height, width)}.")
+        arrays[key] = np.packbits(mask, axis=-1)
+    arrays["flow_points"] = flow_points
+
+    sections = {}
+    offset = 0
+    for key, array in arrays.items():
+        sections[key] = {"offset": offset, "dtype": array.dtype.str, "shape": list(array.shape)}
+        offset = _align(offset + array.nbytes)
+
+    header = json.dumps({
+        "version": BUNDLE_VERSION,
+        "width": width,
+        "height": height,
+        "sources": source_fingerprint(track_sources(track_folder_path)),
+        "metadata": metadata,
+        "sections": sections,
+    }).encode("utf-8")
+    data_start = _align(len(BUNDLE_MAGIC) + 4 + len(header))
+
+    # Write to a temporary file first so a half-written bundle is never loaded
+    bundle_path = os.path.join(track_folder_path, BUNDLE_NAME)
+    tmp_path = bundle_path + ".tmp"
+    with open(tmp_path, "wb") as f:
+        f.write(BUNDLE_MAGIC)
+        f.write(np.uint32(len(header)).tobytes())
+        f.write(header)
+        for key, array in arrays.items():
+            f.write(b"\0" * (data_start + sections[key]["offset"] - f.tell()))
+            f.write(np.ascontiguousarray(array).tobytes())
+    os.replace(tmp_path, bundle_path)
+    return bundle_path
+
+
+class TrackBundle:
+    """A compiled track, memory-mapped from its bundle file: bit-packed masks, float32 flow points and metadata."""
+
+    def __init__(self, path: str, header: dict, data_start: int):
+        self.path = path
+        self.version: int = header["version"]
+        self.width: int = header["width"]
+        self.height: int = header["height"]
+        self.sources: dict[str, list[int]] = header["sources"]
+        self.metadata: dict = header["metadata"]
+        self.sections: dict[str, np.memmap] = {}
+        for key, section in header["sections"].items():
+            self.sections[key] = np.memmap(
+                path,
+                dtype=np.dtype(section["dtype"]),
+                mode="r",
+                offset=data_start + section["offset"],
+                shape=tuple(section["shape"]),
+            )
+
+    @property
+    def nbytes(self) -> int:
+        return sum(section.nbytes for section in self.sections.values())
+
+    def load_into_memory(self):
+        """Copy every section into RAM and release the file."""
+        self.sections = {key: np.array(section) for key, section in self.sections.items()}
+
+    @staticmethod
+    def _read_header(path: str) -> tuple[dict, int]:
+        """Return a bundle's header and the file offset its sections start at."""
+        with open(path, "rb") as f:
+            if f.read(len(BUNDLE_MAGIC)) != BUNDLE_MAGIC:
+                raise RuntimeError(f"Not a track bundle: '{path}'")
+            header_length = int(np.frombuffer(f.read(4), dtype=np.uint32)[0])
+            header = json.loads(f.read(header_length).decode("utf-8"))
+        return header, _align(len(BUNDLE_MAGIC) + 4 + header_length)
+
+    @classmethod
+    def open(cls, path: str) -> "TrackBundle":
+        """Read a bundle's header and map its sections."""
+        return cls(path, *cls._read_header(path))
+
+    @classmethod
+    def load(cls, track_folder_path: str) -> "TrackBundle":
+        """
+        Open a track folder's bundle, building it first if it is missing, unreadable (truncated or corrupt), from an
+        older version, or older than the source files. A bundle with no source files next to it is used as-is.
+        """
+        bundle_path = os.path.join(track_folder_path, BUNDLE_NAME)
+        sources = track_sources(track_folder_path)
+        has_sources = all(os.path.exists(path) for path in sources)
+        if os.path.exists(bundle_path):
+            try:
+                # Check the header before mapping anything, so a stale bundle can be replaced
+                header, _ = cls._read_header(bundle_path)
+                if not has_sources:
+                    return cls.open(bundle_path)
+                if header["version"] == BUNDLE_VERSION and header["sources"] == source_fingerprint(sources):
+                    return cls.open(bundle_path)
+            except (RuntimeError, ValueError, IndexError, KeyError, TypeError, OSError) as e:
+                if not has_sources:
+                    raise
+                vprint(f"Rebuilding unreadable track bundle '{bundle_path}': {e}")
+        return cls.open(build_track_bundle(track_folder_path))
+
+    def mask(self, key: str) -> PackedMask:
+        """One of the stored masks, still bit-packed and memory-mapped (call unpack() for a boolean plane)."""
+        return PackedMask(self.sections[key], self.width)
+
+    @property
+    def track_mask(self) -> PackedMask:
+        return self.mask("track_mask")
+
+    @property
+    def land_mask(self) -> PackedMask:
+        return self.mask("land_mask")
+
+    @property
+    def water_mask(self) -> PackedMask:
+        return self.mask("water_mask")
+
+    @property
+    def flow_points(self) -> np.ndarray:
+        return self.sections["flow_points"]
@@ -0,0 +1,147 @@
+import threading
+from collections import OrderedDict
+from dataclasses import dataclass, field
+
+from data.enums import Track
+from flow_points import FlowPointIndex
+from placement import PlacementEngine
+from system_flags import vprint, TRACK_CACHE_MAX_BYTES
+from track_bundle import TrackBundle
+
+
+def track_folder_path(track: Track) -> str:
+    return f"data/tracks/{track.value.lower().replace(' ', '_')}"
+
+
+@dataclass
+class TrackData:
+    """Everything select_track needs for one track, held in memory."""
+    track: Track
+    bundle: TrackBundle
+    flow_index: FlowPointIndex
+    engine: PlacementEngine
+    # Serializes precompute, so two threads never compute the same maps or write the atlas at the same time
+    _precompute_lock: threading.Lock = field(default_factory=threading.Lock, repr=False, compare=False)
+
+    @property
+    def nbytes(self) -> int:
+        return self.bundle.nbytes + self.flow_index.nbytes + self.engine.nbytes
+
+    @property
+    def atlas_path(self) -> str:
+        return f"{track_folder_path(self.track)}/placement_atlas"
+
+    def precompute(self, signatures):
+        """Make sure every signature's maps exist, saving the atlas again if any had to be computed (thread-safe)."""
+        with self._precompute_lock:
+            if self.engine.precompute(signatures):
+                self.engine.save_atlas(self.atlas_path, [self.bundle.path])
+
+
+def load_track_data(track: Track, signatures) -> TrackData:
+    """Read a track's bundle and placement atlas (building either if needed) and copy them into memory."""
+    folder = track_folder_path(track)
+    bundle = TrackBundle.load(folder)
+    bundle.load_into_memory()
+
+    engine = PlacementEngine.load_atlas(f"{folder}/placement_atlas", [bundle.path])
+    if engine is None:
+        vprint(f"Building placement atlas for {track.value}...")
+        engine = PlacementEngine(
+            bundle.track_mask.unpack(), bundle.land_mask.unpack(), bundle.water_mask.unpack(), bundle.flow_points
+        )
+    # Detach from the atlas files before they can be rewritten
+    engine.load_into_memory()
+
+    data = TrackData(track, bundle, FlowPointIndex(bundle.flow_points), engine)
+    data.precompute(signatures)
+    return data
+
+
+class TrackCache:
+    """
+    Process-wide LRU cache of loaded tracks, holding at most <max_bytes> (the most recent track is always kept).
+    Tracks can be prefetched on a background thread; a get() for a track that is still loading waits for it.
+    """
+
+    def __init__(self, max_bytes: int = TRACK_CACHE_MAX_BYTES):
+        self.max_bytes = max_bytes
+        self._entries: OrderedDict[Track, TrackData] = OrderedDict()
+        self._loading: dict[Track, threading.Event] = {}
+        self._lock = threading.Lock()
+
+    def __contains__(self, track: Track) -> bool:
+        with self._lock:
+            return track in self._entries
+
+    @property
+    def nbytes(self) -> int:
+        with self._lock:
+            return sum(data.nbytes for data in self._entries.values())
+
+    def get(self, track: Track, signatures) -> TrackData:
+        """Return a track's data, loading it on this thread unless it is cached or already loading."""
+        while True:
+            with self._lock:
+                if track in self._entries:
+                    self._entries.move_to_end(track)
+                    data = self._entries[track]
+                    break
+                loading = self._loading.get(track)
+                if loading is None:
+                    loading = self._loading[track] = threading.Event()
+                    owner = True
+                else:
+                    owner = False
+
+            if not owner:
+                # Another thread is loading it; check again once it's done (it may have failed)
+                loading.wait()
+                continue
+
+            try:
+                data = load_track_data(track, signatures)
+                with self._lock:
+                    self._entries[track] = data
+                    self._evict()
+            finally:
+                with self._lock:
+                    del self._loading[track]
+                loading.set()
+            return data
+
+        # Towers can change between visits (e.g. new tower data), so fill in any missing maps
+        data.precompute(signatures)
+        return data
+
+    def prefetch(self, track: Track, signatures) -> threading.Thread | None:
+        """Start loading a track on a background thread. Returns None if it is already cached or loading."""
+        with self._lock:
+            if track in self._entries or track in self._loading:
+                return None
+
+        def load():
+            try:
+                self.get(track, signatures)
+            except Exception as e:
+                print(f"[TrackCache] Prefetch of {track.value} failed: {e}")
+
+        thread = threading.Thread(target=load, daemon=True)
+        thread.start()
+        return thread
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def _evict(self):
+        """Drop least recently used tracks until the cache fits its budget (call with the lock held)."""
+        total = sum(data.nbytes for data in self._entries.values())
+        while total > self.max_bytes and len(self._entries) > 1:
+            track, data = self._entries.popitem(last=False)
+            total -= data.nbytes
+            vprint(f"Evicted {track.value} from the track cache.")
+
+
+# Shared by every brain in the process
+TRACK_CACHE = TrackCache()
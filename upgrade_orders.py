@@ -0,0 +1,140 @@
+import json
+import math
+import os
+
+import numpy as np
+
+from catalog import CATALOG_SOURCES
+from crosspaths import CROSSPATHS, UPGRADE_PATHS, NEXT_COLUMNS, CrosspathStats, crosspath_column
+from data.enums import BloonsDifficulty
+from fingerprint import content_fingerprint
+from system_flags import vprint
+
+UPGRADE_ORDERS_VERSION = 1
+UPGRADE_ORDERS_PATH = "data/upgrade_orders.json"
+# Game data the crosspath stats (and so the solved orders) are derived from
+UPGRADE_ORDER_SOURCES = [CATALOG_SOURCES["towers"], CATALOG_SOURCES["upgrades"]]
+
+# Dollars of spending over which a DPS gain loses ~63% of its value (how far ahead the solver plans)
+UPGRADE_ORDER_HORIZON = 5000.0
+
+
+def solve_upgrade_order(
+        dps: np.ndarray,
+        cost: np.ndarray,
+        horizon: float = UPGRADE_ORDER_HORIZON
+) -> tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """
+    Dynamic programming over one tower's crosspath states, given its DPS and cumulative cost in every state.
+    Money spent stands in for time: a DPS gain bought after spending c more dollars is worth exp(-c / horizon).
+    The value of a state is the best discounted DPS still to gain from it (0 if upgrading further doesn't pay):
+        V(s) = max(0, max over paths of Q(s, path)),  Q(s, path) = exp(-c / horizon) * (dps(s') - dps(s) + V(s'))
+    Tiers only go up, so states are solved from the most upgraded down.
+    A step's score is its Q over the (equally discounted) money spent by taking it and then following the best
+    steps, so it reads like the DPS gained per dollar of a single upgrade but credits what the upgrade leads to.
+    Returns V per state, the score per (state, path) (NaN if illegal) and the best path per state (-1 to stop).
+    """
+    values = np.zeros(len(CROSSPATHS))
+    spent = np.zeros(len(CROSSPATHS))
+    scores = np.full((len(CROSSPATHS), len(UPGRADE_PATHS)), np.nan)
+    best = np.full(len(CROSSPATHS), -1, dtype=np.int8)
+    for column in sorted(range(len(CROSSPATHS)), key=lambda c: -sum(CROSSPATHS[c])):
+        for p, next_column in enumerate(NEXT_COLUMNS[column]):
+            if next_column < 0:
+                continue
+            step_cost = cost[next_column] - cost[column]
+            if step_cost <= 0:
+                continue
+            discount = math.exp(-step_cost / horizon)
+            q = discount * (dps[next_column] - dps[column] + values[next_column])
+            step_spent = step_cost + discount * spent[next_column]
+            scores[column, p] = q / step_spent
+            if q > values[column]:
+                values[column] = q
+                spent[column] = step_spent
+                best[column] = p
+    return values, scores, best
+
+
+def solve_upgrade_orders(stats: CrosspathStats, horizon: float = UPGRADE_ORDER_HORIZON) -> dict:
+    """Solve every tower in a compiled stats table for every difficulty, as a JSON-ready table."""
+    towers = {}
+    for tower, row in stats.rows.items():
+        towers[tower] = {}
+        for difficulty in BloonsDifficulty:
+            dps = stats.table[row]["dps"]
+            cost = stats.table[row]["cost"][:, difficulty.value]
+            values, scores, best = solve_upgrade_order(dps, cost, horizon)
+
+            # Follow the best steps from an unupgraded tower
+            sequence = []
+            column = crosspath_column(dict.fromkeys(UPGRADE_PATHS, 0))
+            while best[column] >= 0:
+                sequence.append(UPGRADE_PATHS[best[column]])
+                column = NEXT_COLUMNS[column, best[column]]
+
+            towers[tower][difficulty.name] = {
+                "sequence": sequence,
+                "values": [float(f"{value:.6g}") for value in values],
+                "scores": [[None if np.isnan(s) else float(f"{s:.6g}") for s in state] for state in scores],
+                "best": [UPGRADE_PATHS[p] if p >= 0 else None for p in best],
+            }
+
+    return {
+        "version": UPGRADE_ORDERS_VERSION,
+        "sources": content_fingerprint(UPGRADE_ORDER_SOURCES),
+        "horizon": horizon,
+        "crosspaths": [list(tiers) for tiers in CROSSPATHS],
+        "towers": towers,
+    }
+
+
+def save_upgrade_orders(orders: dict, path: str = UPGRADE_ORDERS_PATH):
+    tmp_path = path + ".tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(orders, f)
+    os.replace(tmp_path, path)
+
+
+class UpgradeOrders:
+    """
+    Solved upgrade orders, per tower and difficulty: the score of every step from every crosspath state
+    (see solve_upgrade_order).
+    """
+
+    def __init__(self, orders: dict):
+        self.horizon: float = orders["horizon"]
+        self.scores: dict[tuple[str, BloonsDifficulty], np.ndarray] = {}
+        for tower, difficulties in orders["towers"].items():
+            for difficulty in BloonsDifficulty:
+                solved = difficulties.get(difficulty.name)
+                if solved is None:
+                    continue
+                key = (tower, difficulty)
+                self.scores[key] = np.array(
+                    [[np.nan if s is None else s for s in state] for state in solved["scores"]], dtype=np.float64
+                )
+
+    @classmethod
+    def load(cls, path: str = UPGRADE_ORDERS_PATH) -> "UpgradeOrders | None":
+        """
+        Load a solved table, or return None if it is missing, was solved for different crosspath states, or the
+        game data changed since it was solved.
+        """
+        if not os.path.exists(path):
+            return None
+        with open(path, "r", encoding="utf-8") as f:
+            orders = json.load(f)
+        if orders.get("version") != UPGRADE_ORDERS_VERSION:
+            return None
+        if [tuple(tiers) for tiers in orders["crosspaths"]] != CROSSPATHS:
+            return None
+        if orders.get("sources") != content_fingerprint(UPGRADE_ORDER_SOURCES):
+            vprint(f"Upgrade order table at '{path}' is out of date with the game data, "
+                   "re-run processing_tools/solve_upgrade_orders.py.")
+            return None
+        return cls(orders)
+
+    def step_scores(self, tower: str, difficulty: BloonsDifficulty) -> np.ndarray | None:
+        """Score of each step, indexed [crosspath column, path] (NaN where illegal)."""
+        return self.scores.get((tower, difficulty))
@@ -1,57 +1,137 @@
+from functools import lru_cache
+
 import cv2
 import easyocr
 import numpy as np
 from PIL import ImageOps, Image
 
 from data.enums import BloonsScreen, PAGE_IDENTIFIER_POINTS, MAP_SELECT_PAGE_POINTS, SELECTED_MAP_SELECT_TAB_COLOR
-from system_flags import vprint, VERBOSE, SUPPRESS_SCREEN_MATCHING_OUTPUT
+from frame_service import FrameService
+from system_flags import vprint, SUPPRESS_SCREEN_MATCHING_OUTPUT, FRAME_MAX_AGE_MS
+
 
+# Per-channel tolerance when comparing a pixel to an identifier color
+COLOR_TOLERANCE = 5
 
-def color_close(a, b, tol=5):
+
+def color_close(a, b, tol=COLOR_TOLERANCE):
     return all(abs(a[i] - b[i]) <= tol for i in range(3))
 
 
+class ScreenSignatures:
+    """
+    PAGE_IDENTIFIER_POINTS compiled for one frame size: every point's pixel coordinates and expected color as flat
+    arrays, in the order identify_screen checks them. Points of the same match set are contiguous, so a whole frame
+    is classified with one gather, one comparison and one reduction per match set.
+    """
+
+    def __init__(self, width: int, height: int):
+        self.width = width
+        self.height = height
+        xs, ys, colors, set_starts, self.set_screens = [], [], [], [], []
+        for screen, match_sets in PAGE_IDENTIFIER_POINTS.items():
+            for match_set in match_sets:
+                set_starts.append(len(xs))
+                self.set_screens.append(screen)
+                for (w_frac, h_frac), expected_color in match_set:
+                    xs.append(int(width * w_frac))
+                    ys.append(int(height * h_frac))
+                    colors.append(expected_color)
+        self.xs = np.array(xs, dtype=np.intp)
+        self.ys = np.array(ys, dtype=np.intp)
+        self.colors = np.array(colors, dtype=np.int16)
+        self.set_starts = np.array(set_starts, dtype=np.intp)
+        # Match set id of every point (for debug output)
+        self.set_ids = np.repeat(np.arange(len(set_starts)), np.diff(set_starts, append=len(xs)))
+
+    def point_matches(self, pixels: np.ndarray) -> np.ndarray:
+        """Whether each identifier point's pixel (an (n, 3) array in point order) matches its expected color."""
+        return (np.abs(pixels.astype(np.int16) - self.colors) <= COLOR_TOLERANCE).all(axis=1)
+
+    def match(self, pixels: np.ndarray) -> BloonsScreen | None:
+        """The first screen with a fully matching set of identifier points, or None."""
+        matched = np.flatnonzero(np.logical_and.reduceat(self.point_matches(pixels), self.set_starts))
+        return self.set_screens[matched[0]] if matched.size else None
+
+    def report(self, pixels: np.ndarray) -> BloonsScreen | None:
+        """match(), printing every point's result (debug output)."""
+        matches = self.point_matches(pixels)
+        for i, set_id in enumerate(self.set_ids):
+            screen = self.set_screens[set_id]
+            actual_color, expected_color = tuple(pixels[i].tolist()), tuple(self.colors[i].tolist())
+            if matches[i]:
+                vprint(f"{screen.name} point OK {actual_color} ≈ {expected_color}")
+            else:
+                vprint(f"{screen.name} point mismatch {actual_color} != {expected_color}")
+        screen = self.match(pixels)
+        vprint(f"Matched screen: {screen.name}" if screen is not None else "Could not identify current screen.")
+        return screen
+
+
+@lru_cache(maxsize=8)
+def compile_screen_signatures(width: int, height: int) -> ScreenSignatures:
+    return ScreenSignatures(width, height)
+
+
+def frame_size(capture) -> tuple[int, int]:
+    """(width, height) of a PIL image or an (h, w, channels) array."""
+    if isinstance(capture, np.ndarray):
+        return capture.shape[1], capture.shape[0]
+    return capture.width, capture.height
+
+
+def sample_pixels(capture, xs: np.ndarray, ys: np.ndarray) -> np.ndarray:
+    """RGB of the pixels at (xs, ys), as an (n, 3) array."""
+    if isinstance(capture, np.ndarray):
+        return capture[ys, xs, :3]
+    # Reading a few dozen pixels from a PIL image is cheaper than converting the whole frame
+    return np.array([capture.getpixel((x, y))[:3] for x, y in zip(xs.tolist(), ys.tolist())])
+
+
 def identify_screen(capture) -> BloonsScreen | None:
     """Identify the screen using sets of pixel identifiers.
     Each screen can have multiple valid match sets — if any set matches fully, the screen is identified.
+    Accepts a PIL image or an RGB frame array (fastest, as all points are then read with one gather).
     """
+    signatures = compile_screen_signatures(*frame_size(capture))
+    pixels = sample_pixels(capture, signatures.xs, signatures.ys)
+    if SUPPRESS_SCREEN_MATCHING_OUTPUT:
+        return signatures.match(pixels)
+    return signatures.report(pixels)
 
-    for screen, match_sets in PAGE_IDENTIFIER_POINTS.items():
-        # Each screen can have several possible match configurations
-        for match_set in match_sets:
-            all_points_match = True
-
-            for (w_frac, h_frac), expected_color in match_set:
-                px = int(capture.width * w_frac)
-                py = int(capture.height * h_frac)
-                actual_color = capture.getpixel((px, py))
-
-                if not color_close(actual_color, expected_color):
-                    all_points_match = False
-                    if not VERBOSE:
-                        break  # Skip early if mismatch and not debugging
-                    if not SUPPRESS_SCREEN_MATCHING_OUTPUT:
-                        vprint(f"{screen.name} point mismatch {actual_color} != {expected_color}")
-
-                else:
-                    if not SUPPRESS_SCREEN_MATCHING_OUTPUT:
-                        vprint(f"{screen.name} point OK {actual_color} ≈ {expected_color}")
-
-            # If all points in this match set matched, the screen is identified
-            if all_points_match:
-                if not SUPPRESS_SCREEN_MATCHING_OUTPUT:
-                    vprint(f"Matched screen: {screen.name}")
-                return screen
-    if not SUPPRESS_SCREEN_MATCHING_OUTPUT:
-        vprint("Could not identify current screen.")
-    return None
+
+def screen_identifier_pixels(width: int, height: int) -> tuple[np.ndarray, np.ndarray]:
+    """Window coordinates (xs, ys) of every identifier point for a window size (the probe of screen checks)."""
+    signatures = compile_screen_signatures(width, height)
+    return signatures.xs, signatures.ys
+
+
+def identify_screen_fast(
+        frames: FrameService,
+        force_focus: bool = False,
+        max_age_ms: float = FRAME_MAX_AGE_MS
+) -> BloonsScreen | None:
+    """
+    identify_screen on the shared frames: from a buffered full frame or screen check no older than <max_age_ms>,
+    otherwise capturing only the identifier pixels of the window instead of a full frame (see
+    FrameService.get_pixels). Returns None if the window can't be captured.
+    """
+    result = frames.get_pixels(screen_identifier_pixels, max_age_ms, force_focus)
+    if result is None:
+        return None
+    frame, pixels = result
+    signatures = compile_screen_signatures(frame.geometry[2], frame.geometry[3])
+    if SUPPRESS_SCREEN_MATCHING_OUTPUT:
+        return signatures.match(pixels)
+    return signatures.report(pixels)
 
 
 def get_current_tab(capture):
     # Check each tab dot
-    for i, (w_fraction, h_fraction) in enumerate(MAP_SELECT_PAGE_POINTS):
-        point_color = capture.getpixel(
-            (int(capture.width * w_fraction), int(capture.height * h_fraction)))
+    width, height = frame_size(capture)
+    xs = np.array([int(width * w_fraction) for w_fraction, _ in MAP_SELECT_PAGE_POINTS])
+    ys = np.array([int(height * h_fraction) for _, h_fraction in MAP_SELECT_PAGE_POINTS])
+    for i, point_color in enumerate(sample_pixels(capture, xs, ys).tolist()):
         # Find the selected map select tab
         if color_close(point_color, SELECTED_MAP_SELECT_TAB_COLOR):
             vprint(f"Found tab: {i + 1}")
@@ -61,10 +141,12 @@ def get_current_tab(capture):
     return None
 
 
-def ocr_number_from_image(pil_img: Image.Image) -> int | None:
-    # Convert to grayscale
-    gray = ImageOps.grayscale(pil_img)
-    img_array = np.array(gray)
+def ocr_number_from_image(capture: Image.Image | np.ndarray) -> int | None:
+    # Convert to grayscale (same luma weights for PIL images and RGB arrays)
+    if isinstance(capture, np.ndarray):
+        img_array = cv2.cvtColor(np.ascontiguousarray(capture[:, :, :3]), cv2.COLOR_RGB2GRAY)
+    else:
+        img_array = np.array(ImageOps.grayscale(capture))
     _, img_bin = cv2.threshold(img_array, 180, 255, cv2.THRESH_BINARY)
 
     # OCR